@@ -1,6 +1,6 @@
-import sys
-sys.path.append("../")
-from utils.bbox_utils import measure_distance, get_center_of_bbox
+import numpy as np
+from utils.bbox_utils import measure_distance
+from utils.artifacts import stack_tracks
 
 
 class BallAcquisitionDetector:
@@ -114,25 +114,164 @@ class BallAcquisitionDetector:
         return -1  # indicate no one has the ball
     
 
+    def get_minimum_distances_to_ball(self, ball_centers, player_bboxes):
+        # find_minimum_distance_to_ball for N (ball center, player bbox) pairs at once
+        ball_center_x, ball_center_y = ball_centers[:, 0:1], ball_centers[:, 1:2]
+        x1, y1, x2, y2 = (player_bboxes[:, i:i+1] for i in range(4))
+        width = x2 - x1
+        height = y2 - y1
+
+        center_x = x1 + width // 2
+        center_y = y1 + height // 2
+        ball_x = np.broadcast_to(ball_center_x, x1.shape)
+        ball_y = np.broadcast_to(ball_center_y, y1.shape)
+        # the key points in the order of get_key_basketball_player_assignment_points,
+        # then the points at the height and at the x of the ball
+        points_x = np.hstack([center_x, x2, x1, x2, x1, center_x, x2, x1, center_x, center_x,
+                              x1, x2, ball_x, ball_x])
+        points_y = np.hstack([y1, y1, y1, center_y, center_y, center_y, y2, y2, y2, y1 + height // 3,
+                              ball_y, ball_y, y1, y2])
+
+        distances = ((ball_center_x - points_x) ** 2 + (ball_center_y - points_y) ** 2) ** 0.5
+        # the points at the height / x of the ball only count when the ball is inside that span
+        inside_y = ((ball_center_y > y1) & (ball_center_y < y2))[:, 0]
+        inside_x = ((ball_center_x > x1) & (ball_center_x < x2))[:, 0]
+        distances[~inside_y, 10:12] = np.inf
+        distances[~inside_x, 12:14] = np.inf
+        return distances.min(axis=1)
+
+    def get_ball_containment_ratios(self, player_bboxes, ball_bboxes):
+        # calculate_ball_containment_ratio for N (player bbox, ball bbox) pairs at once
+        intersection_x1 = np.maximum(player_bboxes[:, 0], ball_bboxes[:, 0])
+        intersection_y1 = np.maximum(player_bboxes[:, 1], ball_bboxes[:, 1])
+        intersection_x2 = np.minimum(player_bboxes[:, 2], ball_bboxes[:, 2])
+        intersection_y2 = np.minimum(player_bboxes[:, 3], ball_bboxes[:, 3])
+
+        intersection_area = (intersection_x2 - intersection_x1) * (intersection_y2 - intersection_y1)
+        ball_area = (ball_bboxes[:, 2] - ball_bboxes[:, 0]) * (ball_bboxes[:, 3] - ball_bboxes[:, 1])
+        overlaps = (intersection_x2 >= intersection_x1) & (intersection_y2 >= intersection_y1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(overlaps, intersection_area / ball_area, 0.0)
+
+    def find_players_near_ball(self, frame_index, player_bboxes, frame_ball_bboxes, frame_ball_centers):
+        """
+        Sorted-x sweep for the players that could hold the ball.
+
+        A player whose bbox, grown by posession_threshold, doesn't reach the ball bbox or the
+        ball center holds none of the ball and all its key points are at least
+        posession_threshold away from the ball center, so it is never the candidate. The
+        players are sorted by frame and x1, and for every ball only the players whose x1 lies
+        within reach of it are visited and checked.
+
+        Args:
+            frame_index (numpy.ndarray): (N,) frame of every player, in frame order.
+            player_bboxes (numpy.ndarray): (N, 4) player bboxes.
+            frame_ball_bboxes (numpy.ndarray): (num_frames, 4) ball bbox of every frame, NaN without a ball.
+            frame_ball_centers (numpy.ndarray): (num_frames, 2) ball center of every frame.
+
+        Returns:
+            numpy.ndarray: Sorted rows of the players near the ball.
+        """
+        # a pixel of slack keeps float rounding of the distances on the safe side
+        reach = self.posession_threshold + 1
+        ball_frames = np.flatnonzero(~np.isnan(frame_ball_bboxes[:, 0]))
+        ball_frames = ball_frames[np.isin(ball_frames, frame_index)]
+        if len(ball_frames) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # region of every ball, the truncated center may lie just outside a tiny bbox
+        ball_x1 = np.minimum(frame_ball_bboxes[ball_frames, 0], frame_ball_centers[ball_frames, 0])
+        ball_y1 = np.minimum(frame_ball_bboxes[ball_frames, 1], frame_ball_centers[ball_frames, 1])
+        ball_x2 = np.maximum(frame_ball_bboxes[ball_frames, 2], frame_ball_centers[ball_frames, 0])
+        ball_y2 = np.maximum(frame_ball_bboxes[ball_frames, 3], frame_ball_centers[ball_frames, 1])
+
+        # integer sweep keys, frame major and x1 minor, cells are conservative (floor) so no player is missed
+        x1 = player_bboxes[:, 0]
+        x_offset = np.floor(x1.min())
+        num_cells = int(np.floor(x1.max() - x_offset)) + 3
+
+        def get_cells(x):
+            return np.clip(np.floor(x - x_offset) + 1, 0, num_cells - 1).astype(np.int64)
+
+        order = np.lexsort((x1, frame_index))
+        keys = frame_index[order] * num_cells + get_cells(x1[order])
+
+        # a player reaching the ball from the left starts at most its width further left
+        max_widths = np.zeros(len(frame_ball_bboxes))
+        np.maximum.at(max_widths, frame_index, player_bboxes[:, 2] - x1)
+        starts = np.searchsorted(keys, ball_frames * num_cells + get_cells(ball_x1 - reach - max_widths[ball_frames]), "left")
+        ends = np.searchsorted(keys, ball_frames * num_cells + get_cells(ball_x2 + reach), "right")
+
+        # every (ball, player) pair inside the swept ranges
+        lengths = ends - starts
+        pair_ball = np.repeat(np.arange(len(ball_frames)), lengths)
+        pair_row = order[np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - starts, lengths)]
+
+        bboxes = player_bboxes[pair_row]
+        near = ((bboxes[:, 0] - reach <= ball_x2[pair_ball]) & (bboxes[:, 2] + reach >= ball_x1[pair_ball]) &
+                (bboxes[:, 1] - reach <= ball_y2[pair_ball]) & (bboxes[:, 3] + reach >= ball_y1[pair_ball]))
+        return np.sort(pair_row[near])
+
+    def find_best_candidates_for_posession(self, player_tracks, ball_tracks):
+        """
+        find_best_candidate_for_posession for every frame, on the stacked players of the whole video.
+
+        Returns:
+            tuple: (num_frames,) player id closest to the ball of every frame, -1 if there is none,
+                and the (num_frames,) mask of frames with a ball.
+        """
+        num_frames = len(ball_tracks)
+        best_player_ids = np.full(num_frames, -1, dtype=np.int64)
+
+        ball_frames, ball_ids, ball_bboxes = stack_tracks(ball_tracks)
+        is_ball = ball_ids == 1
+        frame_ball_bboxes = np.full((num_frames, 4), np.nan)
+        frame_ball_bboxes[ball_frames[is_ball]] = ball_bboxes[is_ball]
+        has_ball = ~np.isnan(frame_ball_bboxes[:, 0])
+        # int() of get_center_of_bbox truncates
+        frame_ball_centers = np.trunc(np.stack([(frame_ball_bboxes[:, 0] + frame_ball_bboxes[:, 2]) / 2,
+                                                (frame_ball_bboxes[:, 1] + frame_ball_bboxes[:, 3]) / 2], axis=1))
+
+        frame_index, player_ids, player_bboxes = stack_tracks(player_tracks, num_frames)
+        if len(frame_index) == 0:
+            return best_player_ids, has_ball
+
+        # only the players within reach of the ball are evaluated, the order of the rows is kept
+        rows = self.find_players_near_ball(frame_index, player_bboxes, frame_ball_bboxes, frame_ball_centers)
+        frame_index, player_ids, player_bboxes = frame_index[rows], player_ids[rows], player_bboxes[rows]
+        if len(frame_index) == 0:
+            return best_player_ids, has_ball
+
+        containment = self.get_ball_containment_ratios(player_bboxes, frame_ball_bboxes[frame_index])
+        min_distances = self.get_minimum_distances_to_ball(frame_ball_centers[frame_index], player_bboxes)
+        high_containment = containment > self.containment_threshold
+
+        # per frame: high containment players first, the farthest of them, otherwise the closest player,
+        # ties go to the first player of the frame like max() and min()
+        order = np.lexsort((np.arange(len(frame_index)),
+                            np.where(high_containment, -min_distances, min_distances),
+                            ~high_containment,
+                            frame_index))
+        first_of_frame = np.ones(len(order), dtype=bool)
+        first_of_frame[1:] = frame_index[order][1:] != frame_index[order][:-1]
+        best = order[first_of_frame]
+
+        accepted = high_containment[best] | (min_distances[best] < self.posession_threshold)
+        best_player_ids[frame_index[best[accepted]]] = player_ids[best[accepted]]
+        return best_player_ids, has_ball
+
     def detect_ball_posession(self, player_tracks, ball_tracks):
         num_frames = len(ball_tracks)
         posession_list = [-1] * num_frames
         consecutive_posession_count = {}
 
+        best_player_ids, has_ball = self.find_best_candidates_for_posession(player_tracks, ball_tracks)
+        best_player_ids, has_ball = best_player_ids.tolist(), has_ball.tolist()
         for frame_num in range(num_frames):
-            ball_info = ball_tracks[frame_num].get(1, {})
-            if not ball_info:
+            if not has_ball[frame_num]:
                 continue
 
-            ball_bbox = ball_info.get("bbox", [])
-            if not ball_bbox:
-                continue
-
-            ball_center = get_center_of_bbox(ball_bbox)
-
-            best_player_id = self.find_best_candidate_for_posession(ball_center,
-                                                                    player_tracks[frame_num],
-                                                                    ball_bbox)
+            best_player_id = best_player_ids[frame_num]
 
             if best_player_id != -1:
                 number_of_consecutive_frames = consecutive_posession_count.get(best_player_id, 0) + 1
@@ -0,0 +1,234 @@
+"""
+Run the pipeline on many videos with a pool of worker processes.
+
+Every worker loads the models once and processes videos one after the other, so the
+model load and interpreter startup are paid once per worker instead of once per video.
+Each video gets its own directory with the output video, the log of its run and
+its profile, and a summary of throughput and failures is written at the end.
+
+    python batch.py games/ --workers 2
+    python batch.py games.txt --output_dir batch_output -- --stream --chunk_size 64
+
+Arguments after -- are passed to main.py for every video.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+import main
+from utils import get_video_frame_count
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# components of the current worker, loaded by its first video
+_models = None
+
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # everything after -- belongs to main.py
+    if "--" in argv:
+        split_index = argv.index("--")
+        argv, pipeline_args = argv[:split_index], argv[split_index+1:]
+    else:
+        pipeline_args = []
+
+    parser = argparse.ArgumentParser(description="Basketball video analysis of many videos",
+                                     epilog="arguments after -- are passed to main.py for every video")
+    parser.add_argument("inputs", type=str, help="directory of videos, or manifest file with one video path per line")
+    parser.add_argument("--output_dir", type=str, default="output_videos/batch", help="directory for the per-video outputs and the summary")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, each loads its own copy of the models")
+    args = parser.parse_args(argv)
+    args.pipeline_args = pipeline_args
+    return args
+
+
+def batch():
+    args = parse_args()
+    if args.workers < 1:
+        raise ValueError("--workers must be at least 1")
+
+    video_paths = find_videos(args.inputs)
+    if not video_paths:
+        raise ValueError(f"No videos found in {args.inputs}")
+
+    # fail before starting any worker if main.py can't parse the arguments
+    main.parse_args([video_paths[0], *args.pipeline_args])
+
+    tasks = [(video_path, video_output_dir, args.pipeline_args)
+             for video_path, video_output_dir in zip(video_paths, get_output_dirs(video_paths, args.output_dir))]
+
+    print(f"Processing {len(tasks)} videos with {args.workers} workers")
+    start_time = time.perf_counter()
+    results = []
+    # spawn, forked workers can't use CUDA initialized by the parent
+    with multiprocessing.get_context("spawn").Pool(min(args.workers, len(tasks))) as pool:
+        for result in pool.imap_unordered(process_video, tasks):
+            results.append(result)
+            status = "done" if result["status"] == "ok" else f"FAILED ({result['error']})"
+            print(f"[{len(results)}/{len(tasks)}] {result['video']}: {status} in {result['seconds']:.1f}s")
+
+    summary = summarize(results, time.perf_counter() - start_time, args.workers)
+    summary_path = os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print()
+    print(format_summary(summary))
+    print(f"\nSummary written to {summary_path}")
+    if summary["failed"]:
+        sys.exit(1)
+
+
+def find_videos(inputs):
+    """
+    Args:
+        inputs (str): Directory of videos, or manifest file with one video path per line.
+            Empty lines and lines starting with # are skipped, relative paths are
+            relative to the manifest.
+
+    Returns:
+        list: Paths of the videos, in manifest or sorted directory order.
+    """
+    if os.path.isdir(inputs):
+        return [os.path.join(inputs, file_name)
+                for file_name in sorted(os.listdir(inputs))
+                if file_name.lower().endswith(VIDEO_EXTENSIONS)]
+
+    manifest_dir = os.path.dirname(os.path.abspath(inputs))
+    video_paths = []
+    with open(inputs) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            video_paths.append(line if os.path.isabs(line) else os.path.join(manifest_dir, line))
+    return video_paths
+
+
+def get_output_dirs(video_paths, output_dir):
+    # one directory per video named after it, videos with the same name get a suffix
+    output_dirs = []
+    used_names = set()
+    for video_path in video_paths:
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        unique_name = name
+        suffix = 1
+        while unique_name in used_names:
+            suffix += 1
+            unique_name = f"{name}_{suffix}"
+        used_names.add(unique_name)
+        output_dirs.append(os.path.join(output_dir, unique_name))
+    return output_dirs
+
+
+def process_video(task):
+    """
+    Run the pipeline on one video inside a worker.
+
+    Errors don't stop the worker, they are written to the video's log and reported in the result.
+
+    Args:
+        task (tuple): (video_path, video_output_dir, pipeline_args).
+
+    Returns:
+        dict: Status, frames, seconds and output paths of the video.
+    """
+    global _models
+    video_path, video_output_dir, pipeline_args = task
+    os.makedirs(video_output_dir, exist_ok=True)
+
+    result = {
+        "video": video_path,
+        "output_video": os.path.join(video_output_dir, "output.avi"),
+        "log": os.path.join(video_output_dir, "log.txt"),
+        "profile": os.path.join(video_output_dir, "profile.json"),
+        "worker_pid": os.getpid(),
+        "status": "ok",
+        "error": None,
+        "frames": 0,
+    }
+
+    start_time = time.perf_counter()
+    with _redirect_output(result["log"]):
+        try:
+            args = main.parse_args([video_path,
+                                    *pipeline_args,
+                                    "--output_video_path", result["output_video"],
+                                    "--profile_json", result["profile"]])
+            if _models is None:
+                _models = main.create_models(args)
+                main.load_models(_models)
+            main.run(args, _models)
+            result["frames"] = get_video_frame_count(video_path, args.start_frame, args.end_frame)
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start_time
+    result["fps"] = result["frames"] / result["seconds"] if result["frames"] else None
+    return result
+
+
+def summarize(results, wall_seconds, workers):
+    frames = sum(result["frames"] for result in results)
+    failed = [result for result in results if result["status"] != "ok"]
+    return {
+        "videos": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "workers": workers,
+        "frames": frames,
+        "wall_seconds": wall_seconds,
+        "fps": frames / wall_seconds if wall_seconds > 0 else None,
+        "videos_per_hour": len(results) / wall_seconds * 3600 if wall_seconds > 0 else None,
+        "results": sorted(results, key=lambda result: result["video"]),
+    }
+
+
+def format_summary(summary):
+    lines = [f"{'video':<40}  {'status':<6}  {'frames':>7}  {'seconds':>8}  {'fps':>6}"]
+    for result in summary["results"]:
+        fps = "-" if result["fps"] is None else f"{result['fps']:.1f}"
+        lines.append(f"{os.path.basename(result['video']):<40}  {result['status']:<6}  "
+                     f"{result['frames']:>7}  {result['seconds']:>8.1f}  {fps:>6}")
+
+    fps = "-" if summary["fps"] is None else f"{summary['fps']:.1f}"
+    lines.append("")
+    lines.append(f"{summary['succeeded']}/{summary['videos']} videos succeeded, {summary['failed']} failed, "
+                 f"{summary['frames']} frames in {summary['wall_seconds']:.1f}s ({fps} fps with {summary['workers']} workers)")
+    for result in summary["results"]:
+        if result["status"] != "ok":
+            lines.append(f"  FAILED {result['video']}: {result['error']} (see {result['log']})")
+    return "\n".join(lines)
+
+
+@contextmanager
+def _redirect_output(log_path):
+    # redirect the file descriptors rather than sys.stdout, so output of native code and of
+    # loggers that kept a reference to the original streams ends up in the log too
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout, saved_stderr = os.dup(1), os.dup(2)
+    with open(log_path, "w") as log_file:
+        os.dup2(log_file.fileno(), 1)
+        os.dup2(log_file.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_stdout, 1)
+            os.dup2(saved_stderr, 2)
+            os.close(saved_stdout)
+            os.close(saved_stderr)
+
+
+if __name__ == "__main__":
+    batch()
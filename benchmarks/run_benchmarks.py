@@ -0,0 +1,249 @@
+"""
+Offline benchmarks of the CPU stages of the pipeline on a synthetic game.
+
+Times ball acquisition, pass/interception detection, the tactical view, speed and
+distance, every overlay layer and video I/O, and compares the seconds per frame of
+each stage with a stored baseline. A stage slower than its baseline by more than the
+tolerance is a regression and makes the run exit with status 1.
+
+    python -m benchmarks.run_benchmarks                       # compare with the baseline
+    python -m benchmarks.run_benchmarks --update_baseline     # store the current results as the baseline
+
+Baselines are machine specific, they are stored per configuration (frames,
+resolution, players) and only compared with runs of the same configuration.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import pathlib
+import tempfile
+import time
+
+from utils import read_video, save_video, StageProfiler
+from ball_acquisition import BallAcquisitionDetector
+from pass_and_interception_detector import PassAndInterceptionDetector
+from tactical_view_converter import TacticalViewConverter
+from speed_and_distance_calculator import SpeedAndDistanceCalculator
+from drawers import OverlayCompositor, OVERLAY_LAYERS
+from benchmarks.synthetic import make_synthetic_game, COURT_IMAGE_PATH
+
+folder_path = pathlib.Path(__file__).parent.resolve()
+DEFAULT_BASELINE_PATH = str(folder_path / "baseline.json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU stages on a synthetic game")
+    parser.add_argument("--frames", type=int, default=100, help="length of the synthetic video")
+    parser.add_argument("--width", type=int, default=1280, help="frame width of the synthetic video")
+    parser.add_argument("--height", type=int, default=720, help="frame height of the synthetic video")
+    parser.add_argument("--players", type=int, default=10, help="players on the court")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per stage, the fastest one is reported")
+    parser.add_argument("--io_queue_size", type=int, default=8, help="frames buffered between the decode/encode threads and the benchmark")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE_PATH, help="baseline file to compare with")
+    parser.add_argument("--update_baseline", action="store_true", help="store the results as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage before it is a regression, 0.25 is 25%% slower")
+    parser.add_argument("--min_slowdown_ms", type=float, default=1.0, help="slowdowns of a whole stage below this are timer noise, not regressions")
+    parser.add_argument("--output_json", type=str, default=None, help="also write the results as JSON to this path")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = {"frames": args.frames, "width": args.width, "height": args.height, "players": args.players}
+
+    game = make_synthetic_game(args.frames, args.width, args.height, args.players)
+    results = run_benchmarks(game, args.repeats, args.io_queue_size)
+    print(format_results(results))
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as f:
+            json.dump({"config": config, "stages": results}, f, indent=2)
+
+    baselines = load_baselines(args.baseline)
+    config_key = get_config_key(config)
+
+    if args.update_baseline or config_key not in baselines:
+        baselines[config_key] = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "stages": results,
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nStored baseline for {config_key} in {args.baseline}")
+        return
+
+    regressions = find_regressions(results, baselines[config_key]["stages"], args.tolerance, args.min_slowdown_ms / 1000)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}",
+              file=sys.stderr)
+        for stage_name, seconds_per_frame, baseline_seconds_per_frame in regressions:
+            print(f"  {stage_name}: {seconds_per_frame * 1000:.3f} ms/frame, "
+                  f"baseline {baseline_seconds_per_frame * 1000:.3f} ms/frame "
+                  f"({seconds_per_frame / baseline_seconds_per_frame - 1:+.0%})",
+                  file=sys.stderr)
+        sys.exit(1)
+    print(f"\nNo regressions against the baseline for {config_key}")
+
+
+def run_benchmarks(game, repeats=3, io_queue_size=8):
+    """
+    Time every CPU stage on a synthetic game.
+
+    Each stage runs on the outputs of the stages before it, like in main.py.
+
+    Args:
+        game (dict): Synthetic game from make_synthetic_game.
+        repeats (int): Runs per stage, the fastest one is kept.
+        io_queue_size (int): Queue size of the video decode/encode threads.
+
+    Returns:
+        dict: Per stage the frames, fastest seconds and seconds per frame.
+    """
+    player_tracks = game["player_tracks"]
+    ball_tracks = game["ball_tracks"]
+    player_assignment = game["player_assignment"]
+    video_frames = game["video_frames"]
+    num_frames = len(player_tracks)
+
+    stage_seconds = {}
+
+    def run_stage(stage_name, function):
+        best_seconds = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            output = function()
+            seconds = time.perf_counter() - start_time
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        stage_seconds[stage_name] = best_seconds
+        return output
+
+    ball_acquisition_detector = BallAcquisitionDetector()
+    ball_acquisition = run_stage("ball_acquisition",
+                                 lambda: ball_acquisition_detector.detect_ball_posession(player_tracks, ball_tracks))
+
+    pass_and_interception_detector = PassAndInterceptionDetector()
+    passes = run_stage("passes",
+                       lambda: pass_and_interception_detector.detect_passes(ball_acquisition, player_assignment))
+    interceptions = run_stage("interceptions",
+                              lambda: pass_and_interception_detector.detect_interceptions(ball_acquisition, player_assignment))
+
+    tactical_view_converter = TacticalViewConverter(court_image_path=COURT_IMAGE_PATH)
+    court_keypoints = run_stage("validate_keypoints",
+                                lambda: tactical_view_converter.validate_keypoints(game["court_keypoints"]))
+    tactical_player_positions = run_stage("tactical_view",
+                                          lambda: tactical_view_converter.transform_players_to_tactical_view(court_keypoints, player_tracks))
+
+    speed_distance_calculator = SpeedAndDistanceCalculator(
+        tactical_view_converter.width,
+        tactical_view_converter.height,
+        tactical_view_converter.actual_width_in_meters,
+        tactical_view_converter.actual_height_in_meters,
+    )
+    player_distance_per_frame = run_stage("distance",
+                                          lambda: speed_distance_calculator.calculate_distance(tactical_player_positions))
+    player_speed_per_frame = run_stage("speed",
+                                       lambda: speed_distance_calculator.calculate_speed(player_distance_per_frame))
+
+    if not video_frames:
+        return {stage_name: _stage_result(num_frames, seconds) for stage_name, seconds in stage_seconds.items()}
+
+    layer_inputs = {
+        "player_tracks": player_tracks,
+        "ball_tracks": ball_tracks,
+        "court_keypoints": court_keypoints,
+        "player_assignment": player_assignment,
+        "ball_acquisition": ball_acquisition,
+        "passes": passes,
+        "interceptions": interceptions,
+        "tactical_player_positions": tactical_player_positions,
+        "player_distance_per_frame": player_distance_per_frame,
+        "player_speed_per_frame": player_speed_per_frame,
+    }
+
+    # every layer is timed inside the compositor, the fastest run of each layer is kept
+    layer_seconds = {}
+    for _ in range(repeats):
+        profiler = StageProfiler()
+        overlay_compositor = OverlayCompositor(tactical_view_converter.court_image_path,
+                                               tactical_view_converter.width,
+                                               tactical_view_converter.height,
+                                               tactical_view_converter.key_points,
+                                               layers=OVERLAY_LAYERS,
+                                               profiler=profiler,
+                                               )
+        output_video_frames = overlay_compositor.draw(video_frames, layer_inputs)
+        for stage_name, stats in profiler.report()["stages"].items():
+            layer_seconds[stage_name] = min(layer_seconds.get(stage_name, stats["seconds"]), stats["seconds"])
+    stage_seconds.update(layer_seconds)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "synthetic.avi")
+        run_stage("video_write", lambda: save_video(output_video_frames, video_path, queue_size=io_queue_size))
+        run_stage("video_read", lambda: read_video(video_path))
+
+    return {stage_name: _stage_result(num_frames, seconds) for stage_name, seconds in stage_seconds.items()}
+
+
+def find_regressions(results, baseline_results, tolerance, min_slowdown_seconds=0.0):
+    """
+    Returns:
+        list: (stage_name, seconds_per_frame, baseline_seconds_per_frame) of every stage slower
+            than its baseline by more than tolerance and by more than min_slowdown_seconds in total.
+            Stages missing from either side are skipped.
+    """
+    regressions = []
+    for stage_name, stats in results.items():
+        baseline_stats = baseline_results.get(stage_name)
+        if baseline_stats is None or not baseline_stats["seconds_per_frame"]:
+            continue
+        if stats["seconds"] - baseline_stats["seconds"] <= min_slowdown_seconds:
+            continue
+        if stats["seconds_per_frame"] > baseline_stats["seconds_per_frame"] * (1 + tolerance):
+            regressions.append((stage_name, stats["seconds_per_frame"], baseline_stats["seconds_per_frame"]))
+    return regressions
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def get_config_key(config):
+    return f"{config['frames']}f_{config['width']}x{config['height']}_{config['players']}p"
+
+
+def format_results(results):
+    columns = ["stage", "frames", "seconds", "ms/frame"]
+    rows = [[stage_name,
+             str(stats["frames"]),
+             f"{stats['seconds']:.4f}",
+             f"{stats['seconds_per_frame'] * 1000:.3f}"]
+            for stage_name, stats in results.items()]
+
+    widths = [max(len(row[i]) for row in [columns] + rows) for i in range(len(columns))]
+    lines = ["  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                       for i, (cell, width) in enumerate(zip(row, widths)))
+             for row in [columns] + rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def _stage_result(num_frames, seconds):
+    return {
+        "frames": num_frames,
+        "seconds": seconds,
+        "seconds_per_frame": seconds / num_frames if num_frames else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    main()
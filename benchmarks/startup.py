@@ -0,0 +1,116 @@
+"""
+Startup benchmark of main.py.
+
+Times importing main.py and printing --help in fresh interpreters, next to a bare
+interpreter as reference, and checks that importing main.py doesn't import any of
+the heavy dependencies. Those have to wait until a stage needs them, so replaying
+cached stages never loads torch or transformers. The times are compared with the
+"startup" entry of the benchmark baseline like the stage benchmarks.
+
+    python -m benchmarks.startup                       # compare with the baseline
+    python -m benchmarks.startup --update_baseline     # store the current results as the baseline
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.run_benchmarks import DEFAULT_BASELINE_PATH, find_regressions, format_results, load_baselines, _stage_result
+
+REPOSITORY_PATH = str(pathlib.Path(__file__).parent.parent.resolve())
+HEAVY_MODULES = ["torch", "transformers", "ultralytics", "supervision", "pandas"]
+BASELINE_KEY = "startup"
+
+# command of every timed stage, each runs in a fresh interpreter
+STARTUP_COMMANDS = {
+    "python": [sys.executable, "-c", "pass"],
+    "import_main": [sys.executable, "-c", "import main"],
+    "help": [sys.executable, "main.py", "--help"],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of main.py")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per command, the fastest one is reported")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE_PATH, help="baseline file to compare with")
+    parser.add_argument("--update_baseline", action="store_true", help="store the results as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per command before it is a regression, 0.25 is 25%% slower")
+    parser.add_argument("--min_slowdown_ms", type=float, default=20.0, help="slowdowns below this are process startup noise, not regressions")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    heavy_modules = find_heavy_imports()
+    if heavy_modules:
+        print(f"REGRESSION: importing main.py imports {', '.join(heavy_modules)}", file=sys.stderr)
+        sys.exit(1)
+
+    results = run_startup_benchmarks(args.repeats)
+    print(format_results(results))
+
+    baselines = load_baselines(args.baseline)
+    if args.update_baseline or BASELINE_KEY not in baselines:
+        baselines[BASELINE_KEY] = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "stages": results,
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nStored startup baseline in {args.baseline}")
+        return
+
+    regressions = find_regressions(results, baselines[BASELINE_KEY]["stages"], args.tolerance, args.min_slowdown_ms / 1000)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} command(s) slower than the baseline by more than {args.tolerance:.0%}",
+              file=sys.stderr)
+        for stage_name, seconds, baseline_seconds in regressions:
+            print(f"  {stage_name}: {seconds * 1000:.1f} ms, baseline {baseline_seconds * 1000:.1f} ms "
+                  f"({seconds / baseline_seconds - 1:+.0%})",
+                  file=sys.stderr)
+        sys.exit(1)
+    print("\nNo startup regressions against the baseline")
+
+
+def run_startup_benchmarks(repeats=5):
+    """
+    Args:
+        repeats (int): Runs per command, the fastest one is kept.
+
+    Returns:
+        dict: Per command the fastest seconds, in the format of run_benchmarks with one "frame" per run.
+    """
+    results = {}
+    for stage_name, command in STARTUP_COMMANDS.items():
+        best_seconds = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            subprocess.run(command, cwd=REPOSITORY_PATH, check=True, stdout=subprocess.DEVNULL)
+            seconds = time.perf_counter() - start_time
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        results[stage_name] = _stage_result(1, best_seconds)
+    return results
+
+
+def find_heavy_imports():
+    """
+    Returns:
+        list: Modules of HEAVY_MODULES that importing main.py imports.
+    """
+    code = f"import json, sys, main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPOSITORY_PATH, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Synthetic court videos and tracks for benchmarking without model weights or game footage.
+
+The court image is warped into a broadcast-like perspective with a slowly panning
+camera. Players walk around the court, the ball travels between players, and the
+tracks, team assignments and court keypoints are given in the same formats the
+detectors and the team assigner produce, so every CPU stage can run on them.
+"""
+
+import pathlib
+import cv2
+import numpy as np
+from utils.artifacts import CourtKeypoints
+from tactical_view_converter import TacticalViewConverter
+
+folder_path = pathlib.Path(__file__).parent.resolve()
+COURT_IMAGE_PATH = str(folder_path.parent / "images" / "basketball_court.png")
+
+
+def make_synthetic_game(num_frames=100,
+                        width=1280,
+                        height=720,
+                        num_players=10,
+                        possession_length=45,
+                        pass_length=8,
+                        missing_ball_rate=0.05,
+                        seed=0,
+                        with_video=True,
+                        ):
+    """
+    Generate a synthetic game.
+
+    Args:
+        num_frames (int): Length of the video.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        num_players (int): Players on the court, the first half play for team 1.
+        possession_length (int): Frames a player keeps the ball before passing it.
+        pass_length (int): Frames the ball is in the air during a pass.
+        missing_ball_rate (float): Fraction of frames without a ball detection.
+        seed (int): Seed of the random generator, the same arguments give the same game.
+        with_video (bool): Render the frames, tracks alone are much cheaper to generate.
+
+    Returns:
+        dict: video_frames (list of BGR frames, empty without video), player_tracks,
+            ball_tracks, player_assignment and court_keypoints, one item per frame.
+    """
+    rng = np.random.default_rng(seed)
+    tactical_view_converter = TacticalViewConverter(COURT_IMAGE_PATH)
+    court_width, court_height = tactical_view_converter.width, tactical_view_converter.height
+    court_keypoints = np.array(tactical_view_converter.key_points, dtype=np.float32)
+
+    # players random walk on the tactical court
+    positions = rng.uniform([0, 0], [court_width, court_height], size=(num_players, 2))
+    velocities = np.zeros((num_players, 2))
+    track_ids = np.arange(1, num_players + 1)
+    teams = {int(track_id): 1 if index < num_players // 2 else 2 for index, track_id in enumerate(track_ids)}
+
+    court_image = cv2.imread(COURT_IMAGE_PATH) if with_video else None
+    floor_color = (96, 140, 196)
+    ball_radius = max(2, int(height * 0.012))
+
+    holder = 0
+    previous_holder = 0
+    last_pass_frame = -pass_length
+
+    video_frames = []
+    player_tracks = []
+    ball_tracks = []
+    player_assignment = []
+    keypoints = []
+
+    for frame_num in range(num_frames):
+        homography = _court_to_frame_homography(frame_num, width, height, court_width, court_height)
+
+        velocities = 0.9 * velocities + rng.normal(0, 0.3, size=velocities.shape)
+        positions = np.clip(positions + velocities, [0, 0], [court_width, court_height])
+
+        # players are drawn from their feet up, bigger closer to the camera
+        feet = cv2.perspectiveTransform(positions.reshape(-1, 1, 2).astype(np.float32), homography).reshape(-1, 2)
+        bbox_heights = height * 0.25 * (feet[:, 1] / height)
+        bboxes = np.stack([feet[:, 0] - bbox_heights * 0.2,
+                           feet[:, 1] - bbox_heights,
+                           feet[:, 0] + bbox_heights * 0.2,
+                           feet[:, 1]], axis=1)
+
+        frame_tracks = {}
+        for track_id, bbox in zip(track_ids, bboxes):
+            if bbox[2] < 0 or bbox[0] >= width or bbox[3] < 0 or bbox[1] >= height:
+                continue
+            frame_tracks[int(track_id)] = {"bbox": bbox.tolist()}
+        player_tracks.append(frame_tracks)
+        player_assignment.append({track_id: teams[track_id] for track_id in frame_tracks})
+
+        # the ball is held at chest height and passed to a random player every possession_length frames
+        if frame_num > 0 and frame_num % possession_length == 0:
+            previous_holder = holder
+            holder = int(rng.choice([index for index in range(num_players) if index != holder])) if num_players > 1 else 0
+            last_pass_frame = frame_num
+
+        def ball_center(index):
+            x1, y1, x2, y2 = bboxes[index]
+            return np.array([(x1 + x2) / 2, y1 + (y2 - y1) * 0.4])
+
+        progress = min(1.0, (frame_num - last_pass_frame) / pass_length)
+        center = (1 - progress) * ball_center(previous_holder) + progress * ball_center(holder)
+        ball_bbox = np.concatenate([center - ball_radius, center + ball_radius]).tolist()
+        if num_players > 0 and rng.random() >= missing_ball_rate:
+            ball_tracks.append({1: {"bbox": ball_bbox}})
+        else:
+            ball_tracks.append({})
+
+        # keypoints outside the frame are not detected, reported as (0, 0) like the detector does
+        frame_keypoints = cv2.perspectiveTransform(court_keypoints.reshape(-1, 1, 2), homography).reshape(-1, 2)
+        visible = (frame_keypoints[:, 0] > 0) & (frame_keypoints[:, 0] < width) & \
+                  (frame_keypoints[:, 1] > 0) & (frame_keypoints[:, 1] < height)
+        frame_keypoints[~visible] = 0
+        xyn = frame_keypoints / np.array([width, height], dtype=np.float32)
+        keypoints.append(CourtKeypoints(frame_keypoints[np.newaxis],
+                                        xyn[np.newaxis],
+                                        np.where(visible, 0.9, 0.1).astype(np.float32)[np.newaxis],
+                                        (height, width)))
+
+        if with_video:
+            frame = cv2.warpPerspective(court_image,
+                                        _scale_homography(homography, court_image, court_width, court_height),
+                                        (width, height),
+                                        borderMode=cv2.BORDER_CONSTANT,
+                                        borderValue=floor_color)
+            for track_id, player in frame_tracks.items():
+                x1, y1, x2, y2 = (int(value) for value in player["bbox"])
+                color = (255, 245, 238) if teams[track_id] == 1 else (128, 0, 0)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, cv2.FILLED)
+            if ball_tracks[-1]:
+                cv2.circle(frame, (int(center[0]), int(center[1])), ball_radius, (0, 110, 255), cv2.FILLED)
+            video_frames.append(frame)
+
+    return {
+        "video_frames": video_frames,
+        "player_tracks": player_tracks,
+        "ball_tracks": ball_tracks,
+        "player_assignment": player_assignment,
+        "court_keypoints": keypoints,
+    }
+
+
+def _court_to_frame_homography(frame_num, width, height, court_width, court_height):
+    # a camera at the sideline panning slowly from one basket to the other and back
+    pan = 0.35 * width * np.sin(frame_num / 90)
+    source = np.array([[0, 0], [court_width, 0], [court_width, court_height], [0, court_height]], dtype=np.float32)
+    target = np.array([[0.15 * width + pan, 0.3 * height],
+                       [0.85 * width + pan, 0.3 * height],
+                       [1.3 * width + pan, 0.95 * height],
+                       [-0.3 * width + pan, 0.95 * height]], dtype=np.float32)
+    return cv2.getPerspectiveTransform(source, target)
+
+
+def _scale_homography(homography, court_image, court_width, court_height):
+    # the court image is larger than the tactical court the keypoints are defined on
+    image_height, image_width = court_image.shape[:2]
+    scale = np.diag([court_width / image_width, court_height / image_height, 1.0])
+    return homography @ scale
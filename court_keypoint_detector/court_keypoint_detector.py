@@ -1,12 +1,33 @@
-from ultralytics import YOLO
-import sys
-sys.path.append('../')
-from utils import read_stub, save_stub
+from utils import read_stub, save_stub, ModelBackend
+from .keyframe_propagator import KeyframePropagator, to_court_keypoints
 
 
 class CourtKeypointDetector:
-    def __init__(self, model_path):
-        self.model=YOLO(model_path)
+    def __init__(self, model_path, conf=0.5, batch_size=20, keyframe_interval=1, motion_threshold=None, backend=None):
+        self.model_path = model_path
+        self.conf = conf
+        self.batch_size = batch_size
+        # torch, or an exported model on ONNX Runtime / OpenVINO
+        self.backend = backend if backend is not None else ModelBackend()
+        self.model = None
+
+        # keyframe mode: the model only runs every keyframe_interval frames or when the camera
+        # moved more than motion_threshold pixels, the other frames get propagated keypoints
+        self.keyframe_interval = keyframe_interval
+        self.motion_threshold = motion_threshold
+        self.keyframe_propagator = None
+        if keyframe_interval > 1 or motion_threshold is not None:
+            self.keyframe_propagator = KeyframePropagator(keyframe_interval, motion_threshold)
+
+    def load_model(self):
+        if self.model is not None:
+            return
+        self.model = self.backend.load(self.model_path)
+
+    def reset(self):
+        # the next frames don't continue the previous video
+        if self.keyframe_propagator is not None:
+            self.keyframe_propagator.reset()
     
     def get_court_keypoints(self, frames, read_from_stub=False, stub_path=None):
 
@@ -16,13 +37,36 @@ class CourtKeypointDetector:
             if len(court_keypoints) == len(frames):
                 return court_keypoints
         
-        batch_size=20
         court_keypoints = []
-        for i in range(0,len(frames),batch_size):
-            detections_batch = self.model.predict(frames[i:i+batch_size],conf=0.5)
-            for detection in detections_batch:
-                court_keypoints.append(detection.keypoints)
+        for i in range(0,len(frames),self.batch_size):
+            detections_batch = self.detect_batch(frames[i:i+self.batch_size])
+            court_keypoints += self.get_keypoints_from_detections(detections_batch)
 
         save_stub(stub_path,court_keypoints)
         
-        return court_keypoints
\ No newline at end of file
+        return court_keypoints
+
+    def detect_batch(self, batch_frames):
+        # batches have to come in video order in keyframe mode
+        self.load_model()
+        if self.keyframe_propagator is None:
+            return self.model.predict(batch_frames, conf=self.conf)
+
+        plan = self.keyframe_propagator.plan(batch_frames)
+        keyframes = [frame for frame, homography in zip(batch_frames, plan) if homography is None]
+        keyframe_detections = iter(self.model.predict(keyframes, conf=self.conf) if keyframes else [])
+
+        court_keypoints = []
+        for frame, homography in zip(batch_frames, plan):
+            if homography is None:
+                self.keyframe_propagator.reference_keypoints = to_court_keypoints(next(keyframe_detections).keypoints)
+                court_keypoints.append(self.keyframe_propagator.reference_keypoints)
+            else:
+                court_keypoints.append(self.keyframe_propagator.propagate(homography, frame.shape))
+        return court_keypoints
+
+    def get_keypoints_from_detections(self, detections):
+        # in keyframe mode detect_batch already gives the keypoints of every frame
+        if self.keyframe_propagator is not None:
+            return list(detections)
+        return [detection.keypoints for detection in detections]
\ No newline at end of file
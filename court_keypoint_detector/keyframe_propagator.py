@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+from utils.artifacts import CourtKeypoints
+
+
+class KeyframePropagator:
+    """
+    Pick the frames that need court keypoint inference and move the keypoints of the
+    last keyframe along with the camera for the frames in between.
+
+    The camera motion since the last keyframe is estimated from sparse optical flow on
+    downscaled grayscale frames, fitted with a RANSAC homography so players running
+    across the court don't disturb it. A frame becomes a keyframe every
+    keyframe_interval frames, when the camera moved more than motion_threshold pixels
+    since the last keyframe, or when the motion can't be estimated.
+    """
+    def __init__(self, keyframe_interval=10, motion_threshold=None, motion_width=320, max_corners=200):
+        """
+        Args:
+            keyframe_interval (int): Maximum number of frames from one keyframe to the next.
+            motion_threshold (float, optional): Median displacement in pixels of the frame since the
+                last keyframe that triggers a new keyframe, None to only use keyframe_interval.
+            motion_width (int): Width the frames are downscaled to for the motion estimate.
+            max_corners (int): Features tracked from the keyframe.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.motion_threshold = motion_threshold
+        self.motion_width = motion_width
+        self.max_corners = max_corners
+        self.reset()
+
+    def reset(self):
+        self.reference_gray = None
+        self.reference_points = None
+        self.reference_keypoints = None
+        self.frames_since_keyframe = 0
+
+    def plan(self, frames):
+        """
+        Decide for every frame whether it is a keyframe, frames have to come in video order.
+
+        Args:
+            frames (list): Frames of a batch.
+
+        Returns:
+            list: None for keyframes, for the other frames the homography from the last keyframe
+                to the frame in full resolution pixels.
+        """
+        plan = []
+        for frame in frames:
+            gray, scale = self._downscale(frame)
+            self.frames_since_keyframe += 1
+
+            homography, motion = self._estimate_motion(gray, scale)
+            is_keyframe = (homography is None or
+                           self.frames_since_keyframe >= self.keyframe_interval or
+                           (self.motion_threshold is not None and motion > self.motion_threshold))
+
+            if is_keyframe:
+                self.reference_gray = gray
+                self.reference_points = cv2.goodFeaturesToTrack(gray, self.max_corners, 0.01, 8)
+                self.frames_since_keyframe = 0
+                plan.append(None)
+            else:
+                plan.append(homography)
+        return plan
+
+    def propagate(self, homography, frame_shape):
+        """
+        Move the keypoints of the last keyframe into a frame.
+
+        Args:
+            homography (numpy.ndarray): Homography from the last keyframe to the frame.
+            frame_shape (tuple): Shape of the frame.
+
+        Returns:
+            CourtKeypoints: Keypoints of the frame, keypoints that leave the frame are set to (0, 0)
+                like keypoints the detector didn't find.
+        """
+        keypoints = self.reference_keypoints
+        height, width = frame_shape[:2]
+
+        xy = np.zeros_like(keypoints.xy)
+        visible = np.zeros(keypoints.xy.shape[:2], dtype=bool)
+        if keypoints.xy.size:
+            detected = (keypoints.xy[..., 0] > 0) & (keypoints.xy[..., 1] > 0)
+            moved = cv2.perspectiveTransform(keypoints.xy.reshape(-1, 1, 2).astype(np.float32),
+                                             homography).reshape(keypoints.xy.shape)
+            visible = detected & (moved[..., 0] > 0) & (moved[..., 0] < width) & \
+                      (moved[..., 1] > 0) & (moved[..., 1] < height)
+            xy[visible] = moved[visible]
+
+        xyn = xy / np.array([width, height], dtype=np.float32)
+        conf = None if keypoints.conf is None else np.where(visible, keypoints.conf, 0).astype(np.float32)
+        return CourtKeypoints(xy, xyn, conf, (height, width))
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        small_height = max(1, round(height * self.motion_width / width))
+        small = cv2.resize(frame, (self.motion_width, small_height), interpolation=cv2.INTER_AREA)
+        scale = np.array([self.motion_width / width, small_height / height], dtype=np.float32)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scale
+
+    def _estimate_motion(self, gray, scale):
+        # homography from the keyframe to this frame and the median displacement, (None, inf) if unknown
+        if self.reference_points is None or len(self.reference_points) < 8:
+            return None, float("inf")
+
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self.reference_gray, gray, self.reference_points, None)
+        tracked = status.ravel() == 1
+        if tracked.sum() < 8:
+            return None, float("inf")
+
+        source = self.reference_points[tracked].reshape(-1, 2) / scale
+        target = points[tracked].reshape(-1, 2) / scale
+        homography, _ = cv2.findHomography(source, target, cv2.RANSAC, 3.0)
+        motion = float(np.median(np.linalg.norm(target - source, axis=1)))
+        return homography, motion
+
+
+def to_court_keypoints(keypoints):
+    # ultralytics Keypoints -> numpy CourtKeypoints
+    keypoints = keypoints.cpu().numpy()
+    return CourtKeypoints(np.asarray(keypoints.xy, dtype=np.float32),
+                          np.asarray(keypoints.xyn, dtype=np.float32),
+                          None if keypoints.conf is None else np.asarray(keypoints.conf, dtype=np.float32),
+                          tuple(keypoints.orig_shape))
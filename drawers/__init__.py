@@ -4,4 +4,5 @@ from .team_ball_control_drawer import TeamBallControlDrawer
 from .pass_and_interceptions_drawer import PassInterceptionDrawer
 from .court_keypoints_drawer import CourtKeypointDrawer
 from .tactical_view_drawer import TacticalViewDrawer
-from .speed_and_distance_drawer import SpeedAndDistanceDrawer
\ No newline at end of file
+from .speed_and_distance_drawer import SpeedAndDistanceDrawer
+from .overlay_compositor import OverlayCompositor, OVERLAY_LAYERS
\ No newline at end of file
@@ -9,14 +9,17 @@ class BallTracksDrawer:
         output_video_frames=[]
         for frame_num, frame in enumerate(video_frames):
             output_frame = frame.copy()
-            ball_dict = tracks[frame_num]
-
-            for _, track in ball_dict.items():
-                bbox = track["bbox"]
-                if bbox is None:
-                    continue
-                output_frame = draw_triangle(frame, bbox, self.ball_pointer_color)
-
+            output_frame = self.draw_frame(output_frame, tracks[frame_num])
                 
             output_video_frames.append(output_frame)
-        return output_video_frames
\ No newline at end of file
+        return output_video_frames
+
+    def draw_frame(self, frame, ball_dict):
+        # draws in place on frame
+        for _, track in ball_dict.items():
+            bbox = track["bbox"]
+            if bbox is None:
+                continue
+            frame = draw_triangle(frame, bbox, self.ball_pointer_color)
+
+        return frame
\ No newline at end of file
@@ -0,0 +1,126 @@
+import time
+from .player_tracks_drawer import PlayerTracksDrawer
+from .ball_tracks_drawer import BallTracksDrawer
+from .team_ball_control_drawer import TeamBallControlDrawer
+from .pass_and_interceptions_drawer import PassInterceptionDrawer
+from .court_keypoints_drawer import CourtKeypointDrawer
+from .tactical_view_drawer import TacticalViewDrawer
+from .speed_and_distance_drawer import SpeedAndDistanceDrawer
+
+
+# layers in painting order, same order the drawers used to be chained in
+OVERLAY_LAYERS = [
+    "player_tracks",
+    "ball_tracks",
+    "team_ball_control",
+    "pass_interception",
+    "court_keypoints",
+    "tactical_view",
+    "speed_distance",
+]
+
+
+class OverlayCompositor:
+    """
+    Paint every enabled overlay layer onto a single copy of each frame.
+
+    The chained drawers copied and walked every frame once per drawer, the compositor
+    copies each frame once and calls the drawers' draw_frame methods on that buffer,
+    so the output is the same as chaining the drawers.
+
+    layer_inputs is a dict covering the whole video with the keys player_tracks,
+    ball_tracks, player_assignment, ball_acquisition, passes, interceptions,
+    court_keypoints, tactical_player_positions, player_distance_per_frame and
+    player_speed_per_frame.
+    """
+    def __init__(self,
+                 court_image_path,
+                 tactical_width,
+                 tactical_height,
+                 tactical_court_keypoints,
+                 layers=None,
+                 profiler=None,
+                 ):
+        if layers is None:
+            layers = OVERLAY_LAYERS
+        unknown_layers = set(layers) - set(OVERLAY_LAYERS)
+        if unknown_layers:
+            raise ValueError(f"Unknown overlay layers: {sorted(unknown_layers)}")
+        self.layers = [layer for layer in OVERLAY_LAYERS if layer in layers]
+
+        self.player_tracks_drawer = PlayerTracksDrawer()
+        self.ball_tracks_drawer = BallTracksDrawer()
+        self.team_ball_control_drawer = TeamBallControlDrawer()
+        self.pass_interception_drawer = PassInterceptionDrawer()
+        # the keypoint annotators import supervision, only create them for the layer
+        self.court_keypoint_drawer = CourtKeypointDrawer() if "court_keypoints" in self.layers else None
+        self.tactical_view_drawer = TacticalViewDrawer()
+        self.speed_distance_drawer = SpeedAndDistanceDrawer()
+
+        self.tactical_court_keypoints = tactical_court_keypoints
+        self.court_image = None
+        if "tactical_view" in self.layers:
+            self.court_image = self.tactical_view_drawer.load_court_image(court_image_path,
+                                                                          tactical_width,
+                                                                          tactical_height)
+
+        self.team_ball_control = None
+        # optional StageProfiler, each layer is recorded as "draw_<layer>"
+        self.profiler = profiler
+
+    def reset(self, layer_inputs):
+        self.team_ball_control = self.team_ball_control_drawer.get_team_ball_control(layer_inputs["player_assignment"],
+                                                                                     layer_inputs["ball_acquisition"])
+        self.speed_distance_drawer.reset()
+
+    def draw(self, video_frames, layer_inputs, start_frame=0):
+        # video_frames may be a chunk starting at start_frame, chunks have to be drawn in order
+        return list(self.iter_draw(video_frames, layer_inputs, start_frame))
+
+    def iter_draw(self, video_frames, layer_inputs, start_frame=0):
+        # lazy version of draw, a frame is only composited when it is consumed
+        if start_frame == 0 or self.team_ball_control is None:
+            self.reset(layer_inputs)
+
+        for frame_num, frame in enumerate(video_frames, start=start_frame):
+            yield self.draw_frame(frame, frame_num, layer_inputs)
+
+    def draw_frame(self, frame, frame_num, layer_inputs):
+        frame = frame.copy()
+
+        for layer in self.layers:
+            start_time = time.perf_counter()
+
+            if layer == "player_tracks":
+                frame = self.player_tracks_drawer.draw_frame(frame,
+                                                             layer_inputs["player_tracks"][frame_num],
+                                                             layer_inputs["player_assignment"][frame_num],
+                                                             layer_inputs["ball_acquisition"][frame_num])
+            elif layer == "ball_tracks":
+                frame = self.ball_tracks_drawer.draw_frame(frame, layer_inputs["ball_tracks"][frame_num])
+            elif layer == "team_ball_control":
+                frame = self.team_ball_control_drawer.draw_frame(frame, frame_num, self.team_ball_control)
+            elif layer == "pass_interception":
+                frame = self.pass_interception_drawer.draw_frame(frame,
+                                                                 frame_num,
+                                                                 layer_inputs["passes"],
+                                                                 layer_inputs["interceptions"])
+            elif layer == "court_keypoints":
+                frame = self.court_keypoint_drawer.draw_frame(frame, layer_inputs["court_keypoints"][frame_num])
+            elif layer == "tactical_view":
+                frame = self.tactical_view_drawer.draw_frame(frame,
+                                                             self.court_image,
+                                                             self.tactical_court_keypoints,
+                                                             layer_inputs["tactical_player_positions"][frame_num],
+                                                             layer_inputs["player_assignment"][frame_num],
+                                                             layer_inputs["ball_acquisition"][frame_num])
+            elif layer == "speed_distance":
+                frame = self.speed_distance_drawer.draw_frame(frame,
+                                                              layer_inputs["player_tracks"][frame_num],
+                                                              layer_inputs["player_distance_per_frame"][frame_num],
+                                                              layer_inputs["player_speed_per_frame"][frame_num])
+
+            if self.profiler is not None:
+                self.profiler.record(f"draw_{layer}", time.perf_counter() - start_time)
+
+        return frame
@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 
 
 class PassInterceptionDrawer:
@@ -27,10 +28,11 @@ class PassInterceptionDrawer:
 
 
 
-    def draw(self, video_frames, passes, interceptions):
+    def draw(self, video_frames, passes, interceptions, start_frame=0):
+        # passes/interceptions cover the whole video, video_frames may be a chunk starting at start_frame
         output_video_frames = []
 
-        for frame_num, frame in enumerate(video_frames):
+        for frame_num, frame in enumerate(video_frames, start=start_frame):
 
             frame_drawn = self.draw_frame(frame, frame_num, passes, interceptions)
             output_video_frames.append(frame_drawn)
@@ -40,12 +42,11 @@ class PassInterceptionDrawer:
 
     def draw_frame(self, frame, frame_num, passes, interceptions):
 
-        overlay = frame.copy()
         font_scale = 0.7
         font_thickness = 2
 
         # Overlay Position
-        frame_height, frame_width = overlay.shape[:2]
+        frame_height, frame_width = frame.shape[:2]
         rect_x1 = int(frame_width * 0.16)
         rect_y1 = int(frame_height * 0.75)
         rect_x2 = int(frame_width * 0.55)
@@ -56,9 +57,11 @@ class PassInterceptionDrawer:
         text_y1 = int(frame_height * 0.80)
         text_y2 = int(frame_height * 0.88)
 
-        cv2.rectangle(overlay, (rect_x1, rect_y1), (rect_x2, rect_y2), (255,255,255), -1)
+        # only blend the rectangle, pixels outside of it would be blended with themselves
+        overlay_region = frame[rect_y1:rect_y2+1, rect_x1:rect_x2+1]
+        overlay = np.full_like(overlay_region, 255)
         alpha = 0.8  # transparency factor
-        cv2.addWeighted(overlay, alpha, frame, 1-alpha, 0, frame)
+        cv2.addWeighted(overlay, alpha, overlay_region, 1-alpha, 0, overlay_region)
 
         passes_till_frame = passes[:frame_num+1]
         interceptions_till_frame = interceptions[:frame_num+1]
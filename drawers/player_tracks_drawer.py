@@ -1,4 +1,3 @@
-
 from .utils import draw_ellipse, draw_triangle
 
 
@@ -15,26 +14,30 @@ class PlayerTracksDrawer:
         for frame_num, frame in enumerate(video_frames):
             frame = frame.copy()
 
-            player_dict = tracks[frame_num]
+            frame = self.draw_frame(frame,
+                                    tracks[frame_num],
+                                    player_assignment[frame_num],
+                                    ball_acquisition[frame_num])
 
-            player_assignment_for_frame = player_assignment[frame_num]
+            output_video_frames.append(frame)
+        
+        return output_video_frames
 
-            player_id_has_ball = ball_acquisition[frame_num]
+    def draw_frame(self, frame, player_dict, player_assignment_for_frame, player_id_has_ball):
+        # draws in place on frame
 
-            # Draw Players tracks
-            for track_id, player in player_dict.items():
-                team_id = player_assignment_for_frame.get(track_id, self.default_player_team_id)
+        # Draw Players tracks
+        for track_id, player in player_dict.items():
+            team_id = player_assignment_for_frame.get(track_id, self.default_player_team_id)
 
-                if team_id == 1:
-                    color = self.team_1_color
-                else:
-                    color = self.team_2_color
-                
-                if track_id == player_id_has_ball:
-                    frame = draw_triangle(frame, player["bbox"], (0,0,255))
+            if team_id == 1:
+                color = self.team_1_color
+            else:
+                color = self.team_2_color
+            
+            if track_id == player_id_has_ball:
+                frame = draw_triangle(frame, player["bbox"], (0,0,255))
 
-                frame = draw_ellipse(frame, player['bbox'], color, track_id)
+            frame = draw_ellipse(frame, player['bbox'], color, track_id)
 
-            output_video_frames.append(frame)
-        
-        return output_video_frames
+        return frame
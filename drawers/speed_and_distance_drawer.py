@@ -3,36 +3,49 @@ import cv2
 
 class SpeedAndDistanceDrawer():
     def __init__(self):
-        pass
+        self.total_distance = {}
 
-    def draw(self, video_frames, player_tracks, player_distance_per_frame, player_speed_per_frame):
+    def draw(self, video_frames, player_tracks, player_distance_per_frame, player_speed_per_frame, start_frame=0):
+        # tracks/distances/speeds cover the whole video, video_frames may be a chunk starting at start_frame.
+        # total distance is carried over between chunks, so chunks have to be drawn in order
         output_video_frames = []
-        total_distance = {}
+        if start_frame == 0:
+            self.reset()
 
-        for frame, player_tracks, player_distance, player_speed in zip(video_frames, player_tracks, player_distance_per_frame, player_speed_per_frame):
+        for frame_num, frame in enumerate(video_frames, start=start_frame):
             output_frame = frame.copy()
-
-            for player_id, distance in player_distance.items():
-                if player_id not in total_distance:
-                    total_distance[player_id] = 0
-                total_distance[player_id] += distance
-    
-            for player_id, bbox in player_tracks.items():
-                x1, y1, x2, y2 = bbox["bbox"]
-                position = [int((x1+x2)/2), int(y2)]
-                position[1] += 40
-
-                distance = total_distance.get(player_id, None)
-                speed = player_speed.get(player_id, None)
-
-                if speed is not None:
-                    cv2.putText(output_frame, f"{speed:.2f} km/h", position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
-
-                if distance is not None:
-                    cv2.putText(output_frame, f"{distance:.2f} m", (position[0],position[1]+20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
-            
+            output_frame = self.draw_frame(output_frame,
+                                           player_tracks[frame_num],
+                                           player_distance_per_frame[frame_num],
+                                           player_speed_per_frame[frame_num])
             output_video_frames.append(output_frame)
         
         return output_video_frames
-            
 
+    def reset(self):
+        self.total_distance = {}
+
+    def draw_frame(self, frame, player_tracks_frame, player_distance, player_speed):
+        # draws in place on frame and adds player_distance to the running total, frames have to come in order
+        total_distance = self.total_distance
+
+        for player_id, distance in player_distance.items():
+            if player_id not in total_distance:
+                total_distance[player_id] = 0
+            total_distance[player_id] += distance
+
+        for player_id, bbox in player_tracks_frame.items():
+            x1, y1, x2, y2 = bbox["bbox"]
+            position = [int((x1+x2)/2), int(y2)]
+            position[1] += 40
+
+            distance = total_distance.get(player_id, None)
+            speed = player_speed.get(player_id, None)
+
+            if speed is not None:
+                cv2.putText(frame, f"{speed:.2f} km/h", position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
+
+            if distance is not None:
+                cv2.putText(frame, f"{distance:.2f} m", (position[0],position[1]+20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
+
+        return frame
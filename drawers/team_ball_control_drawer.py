@@ -29,12 +29,13 @@ class TeamBallControlDrawer:
         return team_ball_control
 
 
-    def draw(self, video_frames, player_assignment, ball_acquisition):
+    def draw(self, video_frames, player_assignment, ball_acquisition, start_frame=0):
+        # player_assignment/ball_acquisition cover the whole video, video_frames may be a chunk starting at start_frame
 
         team_ball_control = self.get_team_ball_control(player_assignment, ball_acquisition)
 
         output_video_frames = []
-        for frame_num, frame in enumerate(video_frames):
+        for frame_num, frame in enumerate(video_frames, start=start_frame):
             frame_drawn = self.draw_frame(frame, frame_num, team_ball_control)
             output_video_frames.append(frame_drawn)
         
@@ -43,12 +44,11 @@ class TeamBallControlDrawer:
 
     def draw_frame(self, frame, frame_num, team_ball_control):
 
-        overlay = frame.copy()
         font_scale = 0.7
         font_thickness = 2
 
         # Overlay Position
-        frame_height, frame_width = overlay.shape[:2]
+        frame_height, frame_width = frame.shape[:2]
         rect_x1 = int(frame_width * 0.60)
         rect_y1 = int(frame_height * 0.75)
         rect_x2 = int(frame_width * 0.99)
@@ -59,9 +59,11 @@ class TeamBallControlDrawer:
         text_y1 = int(frame_height * 0.80)
         text_y2 = int(frame_height * 0.88)
 
-        cv2.rectangle(overlay, (rect_x1, rect_y1), (rect_x2, rect_y2), (255,255,255), -1)
+        # only blend the rectangle, pixels outside of it would be blended with themselves
+        overlay_region = frame[rect_y1:rect_y2+1, rect_x1:rect_x2+1]
+        overlay = np.full_like(overlay_region, 255)
         alpha = 0.8  # transparency factor
-        cv2.addWeighted(overlay, alpha, frame, 1-alpha, 0, frame)
+        cv2.addWeighted(overlay, alpha, overlay_region, 1-alpha, 0, overlay_region)
 
         team_ball_control_till_frame = team_ball_control[:frame_num+1]
         team_1_num_frames = team_ball_control_till_frame[team_ball_control_till_frame==1].shape[0]
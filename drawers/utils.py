@@ -1,7 +1,5 @@
 import cv2
 import numpy as np
-import sys
-sys.path.append("../")
 from utils import get_bbox_width, get_center_of_bbox
 
 
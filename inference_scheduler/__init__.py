@@ -0,0 +1 @@
+from .inference_scheduler import InferenceScheduler
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+from utils.profiler import get_rss_mb
+
+
+class BatchSizeTuner:
+    """
+    Find the inference batch size with the highest throughput within a memory ceiling.
+
+    The batch size starts at 1 and doubles after every measured batch as long as the
+    frames per second improve and the process stays below the memory ceiling. The
+    probing batches are real batches of the video, nothing is computed twice.
+    """
+    def __init__(self, max_batch_size=64, max_memory_mb=None, min_gain=0.05):
+        """
+        Args:
+            max_batch_size (int): Largest batch size to try.
+            max_memory_mb (float, optional): Resident memory the process may use, by default
+                75% of the physical memory.
+            min_gain (float): Relative fps improvement a larger batch size must bring to keep growing.
+        """
+        self.candidates = [1]
+        while self.candidates[-1] * 2 <= max_batch_size:
+            self.candidates.append(self.candidates[-1] * 2)
+
+        if max_memory_mb is None:
+            max_memory_mb = get_physical_memory_mb() * 0.75 if get_physical_memory_mb() else None
+        self.max_memory_mb = max_memory_mb
+        self.min_gain = min_gain
+
+        self.candidate_index = 0
+        self.batch_size = self.candidates[0]
+        self.done = False
+        self.warmed_up = False
+        # batch size -> measured frames per second
+        self.fps = {}
+
+    def record(self, num_frames, seconds):
+        """
+        Report how long a batch of the current batch size took and move on to the next candidate.
+
+        Args:
+            num_frames (int): Frames in the batch, batches cut short by the end of the video are ignored.
+            seconds (float): Time the models took for the batch.
+        """
+        if self.done or num_frames < self.batch_size:
+            return
+
+        # the first batch pays for loading and warming up the models
+        if not self.warmed_up:
+            self.warmed_up = True
+            return
+
+        memory_mb = get_rss_mb()
+        if self.max_memory_mb is not None and memory_mb is not None and memory_mb > self.max_memory_mb:
+            # over the ceiling, fall back to the best batch size that fitted
+            self._settle(f"memory ceiling of {self.max_memory_mb:.0f} MB reached at batch size {self.batch_size}")
+            return
+
+        self.fps[self.batch_size] = num_frames / seconds if seconds > 0 else float("inf")
+
+        previous_fps = self.fps.get(self.candidates[self.candidate_index-1]) if self.candidate_index > 0 else None
+        if previous_fps is not None and self.fps[self.batch_size] < previous_fps * (1 + self.min_gain):
+            self._settle("throughput stopped improving")
+        elif self.candidate_index + 1 == len(self.candidates):
+            self._settle("largest batch size reached")
+        else:
+            self.candidate_index += 1
+            self.batch_size = self.candidates[self.candidate_index]
+
+    def _settle(self, reason):
+        if self.fps:
+            self.batch_size = max(self.fps, key=self.fps.get)
+        else:
+            self.batch_size = self.candidates[max(self.candidate_index-1, 0)]
+        self.done = True
+        fps = self.fps.get(self.batch_size)
+        fps = "" if fps is None else f", {fps:.1f} fps"
+        print(f"Autotuned inference batch size: {self.batch_size}{fps} ({reason})")
+
+
+def get_physical_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**2
+    except (ValueError, OSError, AttributeError):
+        return None
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .batch_size_tuner import BatchSizeTuner
+
+
+class InferenceScheduler:
+    """
+    Run the player, ball and court keypoint models over the frames in one pass.
+
+    Every batch of frames is sliced once and given to all the models, instead of
+    each detector walking the whole frame list on its own. The models of a batch
+    run concurrently on worker threads (inference releases the GIL), and while they
+    run on the next batch the detections of the previous batch are post-processed
+    in frame order on the calling thread. Every model has its own single-threaded
+    worker, so its batches run one at a time and in order: the predictors are not
+    thread-safe.
+    """
+    def __init__(self,
+                 player_tracker=None,
+                 ball_tracker=None,
+                 court_keypoint_detector=None,
+                 batch_size=20,
+                 num_workers=None,
+                 profiler=None,
+                 max_batch_size=64,
+                 max_memory_mb=None,
+                 ):
+        """
+        Args:
+            player_tracker (PlayerTracker, optional): Left out when its output is not needed.
+            ball_tracker (BallTracker, optional): Left out when its output is not needed.
+            court_keypoint_detector (CourtKeypointDetector, optional): Left out when its output is not needed.
+            batch_size (int or str): Frames per batch, "auto" tunes it on the first batches
+                for the highest fps within max_memory_mb.
+            num_workers (int, optional): Models that run at the same time, by default as many as
+                there are models if the CPU has cores to spare, one otherwise.
+            profiler (StageProfiler, optional): Records "<output>_predict" and "<output>_postprocess".
+            max_batch_size (int): Largest batch size the autotuning tries.
+            max_memory_mb (float, optional): Memory ceiling of the autotuning, see BatchSizeTuner.
+        """
+        # output name -> (run the model on a batch, turn the model output into the pipeline format)
+        self.tasks = {}
+        if player_tracker is not None:
+            self.tasks["player_tracks"] = (player_tracker.detect_batch, player_tracker.get_tracks_from_detections)
+        if ball_tracker is not None:
+            self.tasks["ball_tracks"] = (ball_tracker.detect_batch, ball_tracker.get_tracks_from_detections)
+        if court_keypoint_detector is not None:
+            self.tasks["court_keypoints"] = (court_keypoint_detector.detect_batch,
+                                             court_keypoint_detector.get_keypoints_from_detections)
+
+        if num_workers is None:
+            num_workers = len(self.tasks) if (os.cpu_count() or 1) >= 2 * len(self.tasks) else 1
+        self.batch_size_tuner = None
+        if batch_size == "auto":
+            self.batch_size_tuner = BatchSizeTuner(max_batch_size, max_memory_mb)
+        elif int(batch_size) < 1:
+            raise ValueError("batch_size must be at least 1 or 'auto'")
+        else:
+            batch_size = int(batch_size)
+        self.batch_size = batch_size
+        self.num_workers = max(1, num_workers)
+        self.profiler = profiler
+        # limits how many models predict at the same time
+        self.worker_slots = threading.BoundedSemaphore(self.num_workers)
+
+    def run(self, frames):
+        """
+        Args:
+            frames (list): Frames to run the models on, e.g. the whole video or a chunk of it.
+                Chunks have to be given in order, the player tracker keeps state between them.
+
+        Returns:
+            dict: player_tracks, ball_tracks and/or court_keypoints, one item per frame,
+                for the models the scheduler was created with.
+        """
+        outputs = {output_name: [] for output_name in self.tasks}
+        if not self.tasks or len(frames) == 0:
+            return outputs
+
+        executors = {output_name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"inference_{output_name}")
+                     for output_name in self.tasks}
+        try:
+            pending = None
+            i = 0
+            while i < len(frames):
+                tuning = self.batch_size_tuner is not None and not self.batch_size_tuner.done
+                batch_size = self.batch_size_tuner.batch_size if self.batch_size_tuner is not None else self.batch_size
+                batch_frames = frames[i:i+batch_size]
+                i += len(batch_frames)
+
+                # while tuning a batch is timed on its own, nothing else may run next to it
+                if tuning and pending is not None:
+                    self._postprocess(pending, outputs)
+                    pending = None
+
+                start_time = time.perf_counter()
+                futures = {output_name: executors[output_name].submit(self._predict, output_name, detect_batch, batch_frames)
+                           for output_name, (detect_batch, _) in self.tasks.items()}
+                if tuning:
+                    for future in futures.values():
+                        future.result()
+                    self.batch_size_tuner.record(len(batch_frames), time.perf_counter() - start_time)
+
+                # post-process the previous batch while the models work on this one
+                if pending is not None:
+                    self._postprocess(pending, outputs)
+                pending = futures
+
+            self._postprocess(pending, outputs)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+        return outputs
+
+    def _predict(self, output_name, detect_batch, batch_frames):
+        with self.worker_slots:
+            start_time = time.perf_counter()
+            detections = detect_batch(batch_frames)
+        if self.profiler is not None:
+            self.profiler.record(f"{output_name}_predict", time.perf_counter() - start_time, len(batch_frames))
+        return detections
+
+    def _postprocess(self, futures, outputs):
+        for output_name, future in futures.items():
+            detections = future.result()
+            start_time = time.perf_counter()
+            outputs[output_name] += self.tasks[output_name][1](detections)
+            if self.profiler is not None:
+                self.profiler.record(f"{output_name}_postprocess", time.perf_counter() - start_time, len(detections))
@@ -1,19 +1,12 @@
-from utils import read_video, save_video
+from utils import read_video, read_video_chunks, resolve_frame_range, save_video, StageCache, StageProfiler, PyinstrumentHook, ModelBackend, BACKENDS
 import os
 from trackers import PlayerTracker, BallTracker
-from drawers import(
-    PlayerTracksDrawer,
-    BallTracksDrawer,
-    TeamBallControlDrawer,
-    PassInterceptionDrawer,
-    CourtKeypointDrawer,
-    TacticalViewDrawer,
-    SpeedAndDistanceDrawer,
-)
-from team_assigner import TeamAssigner
+from drawers import OverlayCompositor, OVERLAY_LAYERS
+from team_assigner import TeamAssigner, TEAM_CLASSIFIERS
 from ball_acquisition import BallAcquisitionDetector
 from pass_and_interception_detector import PassAndInterceptionDetector
 from court_keypoint_detector import CourtKeypointDetector
+from inference_scheduler import InferenceScheduler
 from tactical_view_converter import TacticalViewConverter
 from speed_and_distance_calculator import SpeedAndDistanceCalculator
 
@@ -27,75 +20,378 @@ from configs import (
 import argparse
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description= "Basketball video analysis")
     parser.add_argument("input_video", type=str, help="path of input video file")
-    parser.add_argument("--stub_path", type=str, default=STUBS_DEFAULT_PATH, help="path to stub directory")
+    parser.add_argument("--stub_path", type=str, default=STUBS_DEFAULT_PATH, help="path to the stage cache directory")
+    parser.add_argument("--cache_size_gb", type=float, default=20, help="size budget of the stage cache, least recently used entries are evicted above it")
+    parser.add_argument("--no_cache", action="store_true", help="recompute every stage and don't write the stage cache")
     # parser.add_argument("--player_detector_path", type=str, default=PLAYER_DETECTOR_PATH, help="path to player detector model")
     # parser.add_argument("--ball_detector_path", type=str, default=BALL_DETECTOR_PATH, help="path to ball detector model")
     # parser.add_argument("--court_keypoint_detector_path", type=str, default=COURT_KEYPOINT_DETECTOR_PATH, help="path to court keypoint detector model")
-    parser.add_argument("--output_video_path", type=str, default=OUTPUT_VIDEO_PATH, help="path to output video")
-    return parser.parse_args()
+    parser.add_argument("--output_video_path", type=str, default=None, help="path to output video, defaults to OUTPUT_VIDEO_PATH tagged with the frame range")
+    parser.add_argument("--start", type=str, default=None, help="first frame to process, as a frame index, seconds (62.5s) or a [hh:]mm:ss timestamp")
+    parser.add_argument("--end", type=str, default=None, help="frame to stop before, as a frame index, seconds (62.5s) or a [hh:]mm:ss timestamp")
+    parser.add_argument("--stream", action="store_true", help="process the video in fixed-size chunks instead of loading every frame into memory")
+    parser.add_argument("--chunk_size", type=int, default=64, help="number of frames per chunk in streaming mode")
+    parser.add_argument("--io_queue_size", type=int, default=8, help="frames buffered between the decode/encode threads and the pipeline, 0 runs video I/O on the main thread")
+    parser.add_argument("--layers", type=str, nargs="+", choices=OVERLAY_LAYERS, default=OVERLAY_LAYERS, help="overlay layers to draw on the output video")
+    parser.add_argument("--batch_size", type=parse_batch_size, default=20, help="frames per inference batch, or auto to pick the fastest batch size within --max_memory_mb")
+    parser.add_argument("--max_memory_mb", type=float, default=None, help="memory ceiling of --batch_size auto, defaults to 75%% of the physical memory")
+    parser.add_argument("--keypoint_interval", type=int, default=1, help="run the court keypoint model every N frames and propagate the keypoints with the camera motion in between")
+    parser.add_argument("--keypoint_motion_threshold", type=float, default=None, help="also run the court keypoint model when the camera moved more than this many pixels since the last keyframe")
+    parser.add_argument("--ball_roi_size", type=int, default=None, help="search the ball in a crop of this size around its predicted position, full frame after a miss")
+    parser.add_argument("--ball_roi_min_confidence", type=float, default=0.6, help="ball detections in the crop below this confidence are checked on the full frame")
+    parser.add_argument("--backend", type=str, choices=BACKENDS, default="torch", help="run the YOLO models on torch, or export them once and run them on ONNX Runtime or OpenVINO")
+    parser.add_argument("--export_dir", type=str, default="exported_models", help="directory the exported models are cached in")
+    parser.add_argument("--intra_op_threads", type=int, default=None, help="threads used inside one operator of the models, runtime default if not set")
+    parser.add_argument("--inter_op_threads", type=int, default=None, help="operators of the models run at the same time (OpenVINO streams), runtime default if not set")
+    parser.add_argument("--team_classifier", type=str, choices=TEAM_CLASSIFIERS, default="clip", help="classify the teams with CLIP, or cluster the torso colors and only ask CLIP about ambiguous players")
+    parser.add_argument("--quantize_clip", action="store_true", help="run the CLIP image encoder with dynamic int8 quantization, the quantized model is cached in --export_dir")
+    parser.add_argument("--profile", action="store_true", help="record time, fps, latency percentiles and peak RSS of every stage and print them as a table")
+    parser.add_argument("--profile_json", type=str, default=None, help="also write the profile report as JSON to this path")
+    parser.add_argument("--profile_sampler_dir", type=str, default=None, help="run the pyinstrument sampling profiler over every stage and write the reports to this directory")
+    return parser.parse_args(argv)
 
 
-def main():
-    args = parse_args()
+def parse_batch_size(value):
+    if value == "auto":
+        return value
+    batch_size = int(value)
+    if batch_size < 1:
+        raise argparse.ArgumentTypeError("batch size must be at least 1 or auto")
+    return batch_size
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run(args)
+
+
+def run(args, models=None):
+    """
+    Run the pipeline on args.input_video.
+
+    Args:
+        args (argparse.Namespace): Arguments from parse_args.
+        models (dict, optional): Components from create_models to reuse, e.g. when several
+            videos are processed by the same process. They are reset before the run.
+
+    Returns:
+        StageProfiler: The profiler of the run.
+    """
+    if models is None:
+        models = create_models(args)
+    else:
+        reset_models(models)
+
+    # only frames in [start_frame, end_frame) are decoded and go through detection
+    args.start_frame, args.end_frame = resolve_frame_range(args.input_video, args.start, args.end)
+    if args.output_video_path is None:
+        args.output_video_path = tag_with_frame_range(OUTPUT_VIDEO_PATH, args)
+
+    hooks = [PyinstrumentHook(args.profile_sampler_dir)] if args.profile_sampler_dir else []
+    profiler = StageProfiler(enabled=args.profile or args.profile_json is not None or bool(hooks), hooks=hooks)
+
+    with profiler.stage("total"):
+        if args.stream:
+            run_streaming(args, profiler, models)
+        else:
+            run_in_memory(args, profiler, models)
+
+    if args.profile:
+        print(profiler.format_table())
+    if args.profile_json is not None:
+        profiler.save_json(args.profile_json)
+    return profiler
+
+
+def create_models(args):
+    # models are loaded lazily on first use and kept for later runs with the same arguments
+    backend = ModelBackend(args.backend, args.export_dir, args.intra_op_threads, args.inter_op_threads)
+    return {
+        "player_tracker": PlayerTracker(PLAYER_DETECTOR_PATH, backend=backend),
+        "ball_tracker": BallTracker(BALL_DETECTOR_PATH,
+                                    roi_size=args.ball_roi_size,
+                                    roi_min_confidence=args.ball_roi_min_confidence,
+                                    backend=backend),
+        "court_keypoint_detector": CourtKeypointDetector(COURT_KEYPOINT_DETECTOR_PATH,
+                                                         keyframe_interval=args.keypoint_interval,
+                                                         motion_threshold=args.keypoint_motion_threshold,
+                                                         backend=backend),
+        "team_assigner": TeamAssigner(classifier=args.team_classifier,
+                                      quantize=args.quantize_clip,
+                                      export_dir=args.export_dir),
+    }
+
+
+def load_models(models):
+    for model in models.values():
+        model.load_model()
+
+
+def reset_models(models):
+    # per-video state (tracks, team assignments) must not leak into the next video
+    models["player_tracker"].reset()
+    models["ball_tracker"].reset()
+    models["court_keypoint_detector"].reset()
+    models["team_assigner"].reset()
+
+
+def run_in_memory(args, profiler, models):
 
     # Read video
-    video_frames = read_video(args.input_video)
+    video_frames = read_video(args.input_video, args.start_frame, args.end_frame, profiler)
 
     # Initialize Tracker
-    player_tracker = PlayerTracker(PLAYER_DETECTOR_PATH)
-    ball_tracker = BallTracker(BALL_DETECTOR_PATH)
+    player_tracker = models["player_tracker"]
+    ball_tracker = models["ball_tracker"]
 
     # initialize Court keypoint detector
-    court_keypoint_detector = CourtKeypointDetector(COURT_KEYPOINT_DETECTOR_PATH)
-
-    # run tracker
-    player_tracks = player_tracker.get_object_tracks(video_frames,
-                                                     read_from_stub=True,
-                                                     stub_path = os.path.join(args.stub_path, "player_track_stubs.pkl")
-                                                     )
-
-    ball_tracks = ball_tracker.get_object_tracks(video_frames,
-                                                     read_from_stub=True,
-                                                     stub_path = os.path.join(args.stub_path, "ball_track_stubs.pkl")
-                                                     )
-
-   # Get Court Keypoints
-    court_keypoints = court_keypoint_detector.get_court_keypoints(video_frames,
-                                                                 read_from_stub=True,
-                                                                 stub_path = os.path.join(args.stub_path, "court_key_points_stubs.pkl")
-                                                                 ) 
-
-    
-    # remove wrong ball detections
-    ball_tracks = ball_tracker.remove_wrong_detections(ball_tracks)
-    # interpolate ball tracks
-    ball_tracks = ball_tracker.interpolate_ball_positions(ball_tracks)
+    court_keypoint_detector = models["court_keypoint_detector"]
+
+    team_assigner = models["team_assigner"]
+
+    # stages whose inputs did not change since the last run are read from the cache
+    stage_cache = create_stage_cache(args)
+    stage_keys = get_stage_keys(args, stage_cache, player_tracker, ball_tracker, court_keypoint_detector, team_assigner)
+
+    # run tracker and get court keypoints, the models that are needed share one pass over the frames
+    num_frames = len(video_frames)
+
+    player_tracks = read_cached_stage(stage_cache, stage_keys["player_tracks"])
+    ball_tracks = read_cached_stage(stage_cache, stage_keys["ball_tracks"])
+    court_keypoints = read_cached_stage(stage_cache, stage_keys["court_keypoints"])
+
+    inference_scheduler = create_inference_scheduler(player_tracker if player_tracks is None else None,
+                                                     ball_tracker if ball_tracks is None else None,
+                                                     court_keypoint_detector if court_keypoints is None else None,
+                                                     args,
+                                                     profiler)
+    if inference_scheduler.tasks:
+        with profiler.stage("detection", num_frames):
+            detections = inference_scheduler.run(video_frames)
+
+        if player_tracks is None:
+            player_tracks = detections["player_tracks"]
+            write_cached_stage(stage_cache, stage_keys["player_tracks"], player_tracks)
+        if ball_tracks is None:
+            ball_tracks = detections["ball_tracks"]
+            write_cached_stage(stage_cache, stage_keys["ball_tracks"], ball_tracks)
+        if court_keypoints is None:
+            court_keypoints = detections["court_keypoints"]
+            write_cached_stage(stage_cache, stage_keys["court_keypoints"], court_keypoints)
 
     # Assign player teams
-    team_assigner = TeamAssigner()
-    player_assignment = team_assigner.get_player_teams_across_frames(video_frames,
-                                                                player_tracks,
-                                                                read_from_stub=True,
-                                                                stub_path = os.path.join(args.stub_path, "player_assignment_stubs.pkl")
-                                                                )
-    # print(player_teams)
+    player_assignment = read_cached_stage(stage_cache, stage_keys["player_assignment"])
+    if player_assignment is None:
+        with profiler.stage("team_assignment", num_frames):
+            player_assignment = team_assigner.get_player_teams_across_frames(video_frames, player_tracks)
+        write_cached_stage(stage_cache, stage_keys["player_assignment"], player_assignment)
+
+    analytics = run_analytics(ball_tracker, player_tracks, ball_tracks, court_keypoints, player_assignment, profiler)
+
+    # draw output
+    overlay_compositor = create_overlay_compositor(analytics, args.layers, profiler)
+    output_video_frames = overlay_compositor.iter_draw(video_frames, analytics)
+
+    # save video, encoding overlaps with drawing the next frames
+    save_video(output_video_frames, args.output_video_path, queue_size=args.io_queue_size, profiler=profiler)
+
+
+def run_streaming(args, profiler, models):
+    # Peak memory only depends on args.chunk_size: the video is decoded twice, once to
+    # run the detectors chunk by chunk and once to draw and write the output chunk by chunk.
+    player_tracker = models["player_tracker"]
+    ball_tracker = models["ball_tracker"]
+    court_keypoint_detector = models["court_keypoint_detector"]
+    team_assigner = models["team_assigner"]
+
+    stage_cache = create_stage_cache(args)
+    stage_keys = get_stage_keys(args, stage_cache, player_tracker, ball_tracker, court_keypoint_detector, team_assigner)
+
+    player_tracks = read_cached_stage(stage_cache, stage_keys["player_tracks"])
+    ball_tracks = read_cached_stage(stage_cache, stage_keys["ball_tracks"])
+    court_keypoints = read_cached_stage(stage_cache, stage_keys["court_keypoints"])
+    player_assignment = read_cached_stage(stage_cache, stage_keys["player_assignment"])
+
+    run_player_tracker = player_tracks is None
+    run_ball_tracker = ball_tracks is None
+    run_court_keypoint_detector = court_keypoints is None
+    run_team_assigner = player_assignment is None
+
+    inference_scheduler = create_inference_scheduler(player_tracker if run_player_tracker else None,
+                                                     ball_tracker if run_ball_tracker else None,
+                                                     court_keypoint_detector if run_court_keypoint_detector else None,
+                                                     args,
+                                                     profiler)
+
+    if run_player_tracker or run_ball_tracker or run_court_keypoint_detector or run_team_assigner:
+        new_player_tracks = []
+        new_ball_tracks = []
+        new_court_keypoints = []
+        new_player_assignment = []
+
+        for chunk_start, frames in read_video_chunks(args.input_video, args.chunk_size, args.io_queue_size,
+                                                     args.start_frame, args.end_frame, profiler):
+            chunk_end = chunk_start + len(frames)
+
+            # run tracker and get court keypoints
+            if inference_scheduler.tasks:
+                with profiler.stage("detection", len(frames)):
+                    detections = inference_scheduler.run(frames)
+                new_player_tracks += detections.get("player_tracks", [])
+                new_ball_tracks += detections.get("ball_tracks", [])
+                new_court_keypoints += detections.get("court_keypoints", [])
+
+            # Assign player teams
+            if run_team_assigner:
+                chunk_player_tracks = (new_player_tracks if run_player_tracker else player_tracks)[chunk_start:chunk_end]
+                with profiler.stage("team_assignment", len(frames)):
+                    new_player_assignment += team_assigner.get_player_teams_across_frames(frames,
+                                                                                          chunk_player_tracks,
+                                                                                          start_frame=chunk_start)
+
+        if run_player_tracker:
+            player_tracks = new_player_tracks
+            write_cached_stage(stage_cache, stage_keys["player_tracks"], player_tracks)
+        if run_ball_tracker:
+            ball_tracks = new_ball_tracks
+            write_cached_stage(stage_cache, stage_keys["ball_tracks"], ball_tracks)
+        if run_court_keypoint_detector:
+            court_keypoints = new_court_keypoints
+            write_cached_stage(stage_cache, stage_keys["court_keypoints"], court_keypoints)
+        if run_team_assigner:
+            player_assignment = new_player_assignment
+            write_cached_stage(stage_cache, stage_keys["player_assignment"], player_assignment)
+
+    analytics = run_analytics(ball_tracker, player_tracks, ball_tracks, court_keypoints, player_assignment, profiler)
+
+    # draw output
+    overlay_compositor = create_overlay_compositor(analytics, args.layers, profiler)
+
+    def output_video_frames():
+        for chunk_start, frames in read_video_chunks(args.input_video, args.chunk_size, args.io_queue_size,
+                                                     args.start_frame, args.end_frame, profiler):
+            yield from overlay_compositor.iter_draw(frames, analytics, chunk_start)
+
+    # save video, frames are written as soon as they are drawn
+    save_video(output_video_frames(), args.output_video_path, queue_size=args.io_queue_size, profiler=profiler)
+
+
+def create_inference_scheduler(player_tracker, ball_tracker, court_keypoint_detector, args, profiler):
+    return InferenceScheduler(player_tracker,
+                              ball_tracker,
+                              court_keypoint_detector,
+                              batch_size=args.batch_size,
+                              profiler=profiler if profiler.enabled else None,
+                              max_memory_mb=args.max_memory_mb,
+                              )
+
+
+def tag_with_frame_range(path, args):
+    # keeps outputs of different frame ranges of the same video apart
+    if args.start_frame == 0 and args.end_frame is None:
+        return path
+    end_frame = "end" if args.end_frame is None else args.end_frame
+    root, ext = os.path.splitext(path)
+    return f"{root}_frames_{args.start_frame}_{end_frame}{ext}"
+
+
+def create_stage_cache(args):
+    if args.no_cache:
+        return None
+    return StageCache(args.stub_path, max_size_bytes=int(args.cache_size_gb * 1024**3))
+
+
+def get_stage_keys(args, stage_cache, player_tracker, ball_tracker, court_keypoint_detector, team_assigner):
+    # a key covers everything the stage output depends on, any change gives a new key
+    if stage_cache is None:
+        return dict.fromkeys(["player_tracks", "ball_tracks", "court_keypoints", "player_assignment"])
+
+    video = {
+        "video": stage_cache.hash_file(args.input_video),
+        "frame_range": [args.start_frame, args.end_frame],
+    }
+
+    player_tracks_key = stage_cache.make_key("player_tracks", {
+        **video,
+        "model": stage_cache.hash_file(player_tracker.model_path),
+        "backend": player_tracker.backend.name,
+        "conf": player_tracker.conf,
+    })
+    ball_tracks_key = stage_cache.make_key("ball_tracks", {
+        **video,
+        "model": stage_cache.hash_file(ball_tracker.model_path),
+        "backend": ball_tracker.backend.name,
+        "conf": ball_tracker.conf,
+        "roi_size": ball_tracker.roi_size,
+        "roi_min_confidence": ball_tracker.roi_min_confidence if ball_tracker.roi_size is not None else None,
+    })
+    court_keypoints_key = stage_cache.make_key("court_keypoints", {
+        **video,
+        "model": stage_cache.hash_file(court_keypoint_detector.model_path),
+        "backend": court_keypoint_detector.backend.name,
+        "conf": court_keypoint_detector.conf,
+        "keyframe_interval": court_keypoint_detector.keyframe_interval,
+        "motion_threshold": court_keypoint_detector.motion_threshold,
+    })
+    player_assignment_key = stage_cache.make_key("player_assignment", {
+        **video,
+        "model": team_assigner.model_name,
+        "classifier": team_assigner.classifier,
+        "quantized": team_assigner.quantize,
+        "classes": [team_assigner.team_1_class_name, team_assigner.team_2_class_name],
+        "window_size": team_assigner.window_size,
+        "votes": [team_assigner.team_votes.min_samples,
+                  team_assigner.team_votes.sample_spacing,
+                  team_assigner.team_votes.min_confidence],
+    }, upstream_keys=[player_tracks_key])
+
+    return {
+        "player_tracks": player_tracks_key,
+        "ball_tracks": ball_tracks_key,
+        "court_keypoints": court_keypoints_key,
+        "player_assignment": player_assignment_key,
+    }
+
+
+def read_cached_stage(stage_cache, key):
+    if stage_cache is None:
+        return None
+    return stage_cache.get(key)
+
+
+def write_cached_stage(stage_cache, key, value):
+    if stage_cache is not None:
+        stage_cache.put(key, value)
+
+
+def run_analytics(ball_tracker, player_tracks, ball_tracks, court_keypoints, player_assignment, profiler):
+    num_frames = len(player_tracks)
+
+    with profiler.stage("ball_cleanup", num_frames):
+        # remove wrong ball detections
+        ball_tracks = ball_tracker.remove_wrong_detections(ball_tracks)
+        # interpolate ball tracks
+        ball_tracks = ball_tracker.interpolate_ball_positions(ball_tracks)
 
     # Ball Acquisition
-    ball_acquisition_detector = BallAcquisitionDetector()
-    ball_acquisition = ball_acquisition_detector.detect_ball_posession(player_tracks, ball_tracks)
+    with profiler.stage("ball_acquisition", num_frames):
+        ball_acquisition_detector = BallAcquisitionDetector()
+        ball_acquisition = ball_acquisition_detector.detect_ball_posession(player_tracks, ball_tracks)
 
     # Detect passes and interceptions
-    pass_and_interception_detector = PassAndInterceptionDetector()
-    passes = pass_and_interception_detector.detect_passes(ball_acquisition, player_assignment)
-    interceptions = pass_and_interception_detector.detect_interceptions(ball_acquisition, player_assignment)
+    with profiler.stage("passes_and_interceptions", num_frames):
+        pass_and_interception_detector = PassAndInterceptionDetector()
+        passes = pass_and_interception_detector.detect_passes(ball_acquisition, player_assignment)
+        interceptions = pass_and_interception_detector.detect_interceptions(ball_acquisition, player_assignment)
 
     # Tactical View
-    tactical_view_converter = TacticalViewConverter(court_image_path="./images/basketball_court.png")
-    court_keypoints = tactical_view_converter.validate_keypoints(court_keypoints)  # if something is not good, overwrite it with 0,0
-    tactical_player_positions = tactical_view_converter.transform_players_to_tactical_view(court_keypoints, player_tracks)
+    with profiler.stage("tactical_view", num_frames):
+        tactical_view_converter = TacticalViewConverter(court_image_path="./images/basketball_court.png")
+        court_keypoints = tactical_view_converter.validate_keypoints(court_keypoints)  # if something is not good, overwrite it with 0,0
+        tactical_player_positions = tactical_view_converter.transform_players_to_tactical_view(court_keypoints, player_tracks)
 
     # speed and distance calculator
     speed_distance_calculator = SpeedAndDistanceCalculator(
@@ -104,66 +400,35 @@ def main():
         tactical_view_converter.actual_width_in_meters,
         tactical_view_converter.actual_height_in_meters,
     )
-    player_distance_per_frame = speed_distance_calculator.calculate_distance(tactical_player_positions)
-    player_speed_per_frame = speed_distance_calculator.calculate_speed(player_distance_per_frame)
-
-    
-
+    with profiler.stage("speed_and_distance", num_frames):
+        player_distance_per_frame = speed_distance_calculator.calculate_distance(tactical_player_positions)
+        player_speed_per_frame = speed_distance_calculator.calculate_speed(player_distance_per_frame)
 
-    # draw output
-    # initialize drawer
-    player_tracks_drawer = PlayerTracksDrawer()
-    ball_tracks_drawer = BallTracksDrawer()
-    team_ball_control_drawer = TeamBallControlDrawer()
-    pass_interception_drawer = PassInterceptionDrawer()
-    court_keypoint_drawer = CourtKeypointDrawer()
-    tactical_view_drawer = TacticalViewDrawer()
-    speed_distance_drawer = SpeedAndDistanceDrawer()
-
-    # draw object tracks
-    output_video_frames = player_tracks_drawer.draw(video_frames,
-                                                    player_tracks,
-                                                    player_assignment,
-                                                    ball_acquisition)
-    output_video_frames = ball_tracks_drawer.draw(output_video_frames, ball_tracks)
-
-    # Draw Team Ball Control
-    output_video_frames = team_ball_control_drawer.draw(output_video_frames,
-                                                         player_assignment,
-                                                         ball_acquisition)
-
-    # Draw passes and interceptions
-    output_video_frames = pass_interception_drawer.draw(output_video_frames,
-                                                        passes,
-                                                        interceptions)
-
-    # Draw court keypoints
-    output_video_frames = court_keypoint_drawer.draw(output_video_frames,
-                                                     court_keypoints)
+    return {
+        "player_tracks": player_tracks,
+        "ball_tracks": ball_tracks,
+        "court_keypoints": court_keypoints,
+        "player_assignment": player_assignment,
+        "ball_acquisition": ball_acquisition,
+        "passes": passes,
+        "interceptions": interceptions,
+        "tactical_view_converter": tactical_view_converter,
+        "tactical_player_positions": tactical_player_positions,
+        "player_distance_per_frame": player_distance_per_frame,
+        "player_speed_per_frame": player_speed_per_frame,
+    }
 
-    # Tactical View
-    output_video_frames = tactical_view_drawer.draw(output_video_frames,
-                                                   tactical_view_converter.court_image_path,
-                                                   tactical_view_converter.width,
-                                                   tactical_view_converter.height,
-                                                   tactical_view_converter.key_points,
-                                                   tactical_player_positions,
-                                                   player_assignment,
-                                                   ball_acquisition,
-                                                   )
-    
-    # Speed and Distance Drawer
-    output_video_frames = speed_distance_drawer.draw(
-        output_video_frames,
-        player_tracks,
-        player_distance_per_frame,
-        player_speed_per_frame,
-    )
 
-    # save video
-    save_video(output_video_frames, args.output_video_path)
+def create_overlay_compositor(analytics, layers, profiler):
+    tactical_view_converter = analytics["tactical_view_converter"]
+    return OverlayCompositor(tactical_view_converter.court_image_path,
+                             tactical_view_converter.width,
+                             tactical_view_converter.height,
+                             tactical_view_converter.key_points,
+                             layers=layers,
+                             profiler=profiler if profiler.enabled else None,
+                             )
 
 
 if __name__ == "__main__":
     main()
-
@@ -84,11 +84,6 @@
 #         return speeds
 
 
-import os
-import sys
-import pathlib
-folder_path = pathlib.Path(__file__).parent.resolve()
-sys.path.append(os.path.join(folder_path,"../"))
 from utils import measure_distance
 
 
@@ -1,7 +1,5 @@
 from copy import deepcopy
-import sys
 from .homograph import Homograph
-sys.path.append("../")
 from utils import measure_distance, get_foot_position
 import numpy as np
 import cv2
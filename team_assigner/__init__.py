@@ -1 +1 @@
-from .team_assigner import TeamAssigner
\ No newline at end of file
+from .team_assigner import TeamAssigner, TEAM_CLASSIFIERS
@@ -0,0 +1,126 @@
+"""
+Dynamic int8 quantization of the CLIP image encoder for CPU team assignment.
+
+The Linear layers of the vision tower and of the visual projection are quantized
+to int8 weights with activations quantized on the fly. The quantized model is
+cached on disk, later runs load it directly without the full precision weights.
+The text tower stays in fp32, it only encodes the two prompts once.
+
+Check that the teams don't change on a reference clip before relying on it:
+
+    python -m team_assigner.clip_quantization input_videos/video_1.mp4 stubs/player_track_stubs.pkl
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+
+def get_quantized_path(model_name, export_dir):
+    import torch
+
+    # pickled quantized modules only load on the torch version that wrote them
+    name = model_name.replace("/", "--")
+    return os.path.join(export_dir, f"{name}-int8-torch{torch.__version__}.pt")
+
+
+def load_quantized_clip(model_name, export_dir="exported_models"):
+    """
+    Load the quantized CLIP model, quantizing and caching it first if there is no cached one.
+
+    Args:
+        model_name (str): Hugging Face name of the CLIP model.
+        export_dir (str): Directory the quantized model is cached in.
+
+    Returns:
+        transformers.CLIPModel: Model with an int8 image encoder, in eval mode.
+    """
+    import torch
+
+    quantized_path = get_quantized_path(model_name, export_dir)
+    if os.path.exists(quantized_path):
+        return torch.load(quantized_path, weights_only=False).eval()
+
+    model = quantize_clip(model_name)
+    # written next to the destination and moved in place, another process may be loading it
+    os.makedirs(export_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=export_dir, suffix=".tmp")
+    try:
+        tmp_path = os.path.join(tmp_dir, os.path.basename(quantized_path))
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, quantized_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return model
+
+
+def quantize_clip(model_name):
+    import torch
+    from transformers import CLIPModel
+
+    model = CLIPModel.from_pretrained(model_name).eval()
+    qconfig = torch.ao.quantization.default_dynamic_qconfig
+    # only the image side runs per crop
+    return torch.ao.quantization.quantize_dynamic(model,
+                                                  {"vision_model": qconfig, "visual_projection": qconfig},
+                                                  dtype=torch.qint8)
+
+
+def compare_quantized_clip(video_frames, player_tracks, export_dir="exported_models", frame_step=10):
+    """
+    Classify the same player crops with the fp32 and the quantized CLIP model.
+
+    Args:
+        video_frames (list): Frames of the reference clip.
+        player_tracks (list): Player tracks of the frames.
+        export_dir (str): Directory the quantized model is cached in.
+        frame_step (int): Every frame_step-th frame is used.
+
+    Returns:
+        dict: Number of crops, how many got a different team and the largest difference of the
+            team probabilities.
+    """
+    from .team_assigner import TeamAssigner
+
+    player_crops = [(video_frames[frame_num], track["bbox"])
+                    for frame_num in range(0, len(player_tracks), frame_step)
+                    for track in player_tracks[frame_num].values()]
+    if not player_crops:
+        raise ValueError("No players in the sampled frames")
+
+    reference = TeamAssigner().get_clip_probabilities(player_crops)
+    quantized = TeamAssigner(quantize=True, export_dir=export_dir).get_clip_probabilities(player_crops)
+
+    disagreements = int((reference.argmax(axis=1) != quantized.argmax(axis=1)).sum())
+    return {
+        "crops": len(player_crops),
+        "disagreements": disagreements,
+        "disagreement_rate": disagreements / len(player_crops),
+        "max_probability_difference": float(np.abs(reference - quantized).max()),
+    }
+
+
+if __name__ == "__main__":
+    from utils import read_video, read_stub
+
+    parser = argparse.ArgumentParser(description="Check that the quantized CLIP model assigns the same teams as fp32")
+    parser.add_argument("video_path", type=str, help="reference clip")
+    parser.add_argument("player_tracks_path", type=str, help="player tracks of the clip, stub or artifact")
+    parser.add_argument("--export_dir", type=str, default="exported_models")
+    parser.add_argument("--frame_step", type=int, default=10, help="classify the players of every N-th frame")
+    parser.add_argument("--max_disagreement", type=float, default=0.02, help="largest allowed share of crops with a different team")
+    args = parser.parse_args()
+
+    player_tracks = read_stub(True, args.player_tracks_path)
+    if player_tracks is None:
+        raise ValueError(f"No player tracks at {args.player_tracks_path}")
+    video_frames = read_video(args.video_path, end_frame=len(player_tracks))
+    comparison = compare_quantized_clip(video_frames, player_tracks[:len(video_frames)], args.export_dir, args.frame_step)
+    print(comparison)
+    if comparison["disagreement_rate"] > args.max_disagreement:
+        print(f"quantized CLIP disagrees with fp32 on {comparison['disagreement_rate']:.1%} of the crops", file=sys.stderr)
+        sys.exit(1)
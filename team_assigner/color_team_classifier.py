@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from .torso_crops import get_torso_crops
+
+
+class ColorTeamClassifier:
+    """
+    Split the players into two teams by the color of their torso.
+
+    Every crop is reduced to the median Lab color of the torso band of its bbox, and
+    k-means with two clusters is fitted on the first fit_samples crops of a video.
+    Which cluster is which team is decided by the stronger classifier the caller
+    falls back to, on the label_samples crops closest to each cluster center, so both
+    classifiers agree on what team 1 is. A crop belongs to the nearer cluster, with a
+    probability that falls to 0.5 as it gets equally far from both. Crops below
+    min_confidence, and all crops when the two clusters are not min_separation apart,
+    are reported as ambiguous so the caller can ask the stronger classifier.
+    """
+    def __init__(self, label_crops, fit_samples=20, min_confidence=0.65, min_separation=10.0, feature_size=8,
+                 label_samples=5):
+        """
+        Args:
+            label_crops (callable): Gives the (N, 2) probabilities of team 1 and team 2 of a list of
+                (frame, bbox) crops, used to tell which cluster is which team.
+            fit_samples (int): Crops the clusters are fitted on.
+            min_confidence (float): Probability of the nearer cluster below which a crop is ambiguous.
+            min_separation (float): Lab distance between the cluster centers below which the colors
+                can't be told apart.
+            feature_size (int): Side the torso band is downscaled to before taking the median color.
+            label_samples (int): Crops per cluster given to label_crops.
+        """
+        self.label_crops = label_crops
+        self.label_samples = label_samples
+        self.fit_samples = fit_samples
+        self.min_confidence = min_confidence
+        self.min_separation = min_separation
+        self.feature_size = feature_size
+        self.reset()
+
+    def reset(self):
+        # the clusters belong to the jerseys of one video
+        self.centers = None
+        self.fit_features = []
+        self.fit_crops = []
+
+    def get_features(self, player_crops):
+        """
+        Args:
+            player_crops (list): (frame, bbox) of every player.
+
+        Returns:
+            numpy.ndarray: (N, 3) median Lab color of the torso of every player.
+        """
+        if not player_crops:
+            return np.zeros((0, 3), dtype=np.float32)
+        crops, valid = get_torso_crops(player_crops, self.feature_size)
+        lab = cv2.cvtColor(crops.reshape(-1, self.feature_size, 3), cv2.COLOR_BGR2LAB)
+        features = np.median(lab.reshape(len(crops), -1, 3), axis=1).astype(np.float32)
+        features[~valid] = np.nan
+        return features
+
+    def predict(self, player_crops):
+        """
+        Args:
+            player_crops (list): (frame, bbox) of every player.
+
+        Returns:
+            tuple: (N, 2) probabilities of team 1 and team 2, and the (N,) mask of ambiguous crops.
+        """
+        features = self.get_features(player_crops)
+        if self.centers is None:
+            valid = np.flatnonzero(~np.isnan(features).any(axis=1))
+            self.fit_features += [features[i] for i in valid]
+            self.fit_crops += [player_crops[i] for i in valid]
+            if len(self.fit_features) < self.fit_samples:
+                return np.full((len(features), 2), 0.5), np.ones(len(features), dtype=bool)
+            self.fit(np.array(self.fit_features, dtype=np.float32), self.fit_crops)
+
+        distances = np.linalg.norm(features[:, None, :] - self.centers[None, :, :], axis=2)
+        # closer to a center -> higher probability, 0.5 on the border between the clusters
+        probabilities = distances[:, ::-1] / np.maximum(distances.sum(axis=1, keepdims=True), 1e-6)
+        ambiguous = np.isnan(features).any(axis=1) | (probabilities.max(axis=1) < self.min_confidence)
+        if np.linalg.norm(self.centers[0] - self.centers[1]) < self.min_separation:
+            ambiguous[:] = True
+        probabilities[np.isnan(probabilities)] = 0.5
+        return probabilities, ambiguous
+
+    def fit(self, features, crops):
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.5)
+        _, labels, centers = cv2.kmeans(features, 2, None, criteria, 5, cv2.KMEANS_PP_CENTERS)
+        labels = labels.ravel()
+
+        # mean team probabilities of the crops closest to each center
+        team_scores = np.zeros((2, 2))
+        for cluster in range(2):
+            members = np.flatnonzero(labels == cluster)
+            if len(members) == 0:
+                continue
+            closest = members[np.argsort(np.linalg.norm(features[members] - centers[cluster], axis=1))]
+            team_scores[cluster] = self.label_crops([crops[i] for i in closest[:self.label_samples]]).mean(axis=0)
+
+        # center i is team i+1, swapped when the other way round fits the labels better
+        if team_scores[0, 1] + team_scores[1, 0] > team_scores[0, 0] + team_scores[1, 1]:
+            centers = centers[::-1]
+        self.centers = centers
+        self.fit_features = []
+        self.fit_crops = []
@@ -1,65 +1,169 @@
-from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
-import cv2
-import sys
-sys.path.append("../")
+import numpy as np
 from utils import read_stub, save_stub
+from .team_votes import TeamVotes
+from .color_team_classifier import ColorTeamClassifier
+from .torso_crops import get_torso_crops, get_torso_band
+
+# clip: zero-shot CLIP on every crop, color: k-means on torso colors with CLIP for ambiguous crops
+TEAM_CLASSIFIERS = ["clip", "color"]
 
 
 class TeamAssigner:
     def __init__(self,
                  team_1_class_name="white shirt",
                  team_2_class_name="dark red shirt",
+                 model_name="patrickjohncyh/fashion-clip",
+                 batch_size=32,
+                 window_size=50,
+                 min_samples=3,
+                 sample_spacing=15,
+                 min_confidence=0.7,
+                 classifier="clip",
+                 quantize=False,
+                 export_dir="exported_models",
                  ):
         
+        if classifier not in TEAM_CLASSIFIERS:
+            raise ValueError(f"Unknown team classifier {classifier}, choose from {TEAM_CLASSIFIERS}")
         self.team_1_class_name = team_1_class_name
         self.team_2_class_name = team_2_class_name
+        self.model_name = model_name
+        # player crops per forward pass of the image encoder
+        self.batch_size = batch_size
+        # the crops of window_size frames are classified together
+        self.window_size = window_size
 
         self.team_colors = {}
-        self.player_team_dict = {}
+        # a few well separated crops per track vote on its team, see TeamVotes
+        self.team_votes = TeamVotes(min_samples, sample_spacing, min_confidence)
+        self.classifier = classifier
+        # the color clusters are matched to the teams by CLIP, so ambiguous crops vote for the same team
+        self.color_classifier = ColorTeamClassifier(self.get_clip_probabilities) if classifier == "color" else None
+        # int8 image encoder, cached in export_dir, see clip_quantization
+        self.quantize = quantize
+        self.export_dir = export_dir
+        self.model = None
 
     def load_model(self):
-        self.model = CLIPModel.from_pretrained("patrickjohncyh/fashion-clip")
-        self.processor = CLIPProcessor.from_pretrained("patrickjohncyh/fashion-clip")
-
-    def get_player_color(self, frame, bbox):
-        # bbox --> x1, y1, x2, y2
-        image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]  # cropped image of a player
-
-        # pytorch takes pil image (RGB)
-        # opencv (BGR)
-        # convert
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_image)
+        # the color classifier only loads CLIP once a crop is ambiguous
+        if self.classifier == "clip":
+            self.load_clip_model()
+
+    def load_clip_model(self):
+        if self.model is not None:
+            return
+        from transformers import CLIPProcessor, CLIPModel
+
+        if self.quantize:
+            from .clip_quantization import load_quantized_clip
+
+            self.model = load_quantized_clip(self.model_name, self.export_dir)
+        else:
+            self.model = CLIPModel.from_pretrained(self.model_name).eval()
+        self.processor = CLIPProcessor.from_pretrained(self.model_name)
+        # the class prompts never change, encode them once
+        self.text_embeddings = self.encode_classes()
+        self.logit_scale = self.model.logit_scale.exp().item()
+
+        # the crops are preprocessed here instead of by the processor, see get_clip_probabilities
+        image_processor = self.processor.image_processor
+        crop_size = image_processor.crop_size
+        self.input_size = crop_size["height"] if isinstance(crop_size, dict) else crop_size
+        self.image_mean = np.array(image_processor.image_mean, dtype=np.float32)
+        self.image_std = np.array(image_processor.image_std, dtype=np.float32)
+        self.crop_batch = np.empty((self.batch_size, self.input_size, self.input_size, 3), dtype=np.uint8)
+
+    def encode_classes(self):
+        import torch
 
         classes = [self.team_1_class_name, self.team_2_class_name]
+        inputs = self.processor(text=classes, return_tensors="pt", padding=True)
+        with torch.inference_mode():
+            text_embeddings = self.model.get_text_features(**inputs)
+        return text_embeddings / text_embeddings.norm(dim=-1, keepdim=True)
 
-        inputs = self.processor(text=classes, images=pil_image, return_tensors="pt", padding=True)
-
-        outputs = self.model(**inputs)
-        logits_per_image = outputs.logits_per_image # this is the image-text similarity score
-        probs = logits_per_image.softmax(dim=1)
-
-        class_name = classes[probs.argmax(dim=1)[0]]
-        return class_name
-    
-    def get_player_team(self, frame, player_bbox, player_id):
-        
-        # cache
-        if player_id in self.player_team_dict:
-            return self.player_team_dict[player_id]
-        
-        player_color = self.get_player_color(frame, player_bbox)
-
-        team_id = 2
-        if player_color == self.team_1_class_name:
-            team_id = 1
-        
-        self.player_team_dict[player_id] = team_id
-        return team_id
-
+    def reset(self):
+        # forget the teams of the previous video, the loaded model is kept
+        self.team_colors = {}
+        self.team_votes.reset()
+        if self.color_classifier is not None:
+            self.color_classifier.reset()
 
-    def get_player_teams_across_frames(self, video_frames, player_tracks, read_from_stub=False, stub_path=None):
+    def get_player_color(self, frame, bbox):
+        classes = [self.team_1_class_name, self.team_2_class_name]
+        return classes[int(np.argmax(self.get_player_probabilities([(frame, bbox)])[0]))]
+
+    def get_player_probabilities(self, player_crops):
+        """
+        Classify the shirt color of many players with the selected classifier.
+
+        Args:
+            player_crops (list): (frame, bbox) of every player to classify.
+
+        Returns:
+            numpy.ndarray: (N, 2) probabilities of team 1 and team 2 for every player.
+        """
+        if self.color_classifier is None:
+            return self.get_clip_probabilities(player_crops)
+
+        probabilities, ambiguous = self.color_classifier.predict(player_crops)
+        if ambiguous.any():
+            ambiguous_crops = [player_crops[i] for i in np.flatnonzero(ambiguous)]
+            probabilities[ambiguous] = self.get_clip_probabilities(ambiguous_crops)
+        return probabilities
+
+    def get_clip_probabilities(self, player_crops):
+        """
+        Classify the shirt color of many players, the crops go through the image encoder in batches.
+
+        Args:
+            player_crops (list): (frame, bbox) of every player to classify.
+
+        Returns:
+            numpy.ndarray: (N, 2) probabilities of team 1 and team 2 for every player, 0.5 for both
+                when the torso band lies outside the frame.
+        """
+        import torch
+
+        self.load_clip_model()
+        probabilities = [np.zeros((0, 2), dtype=np.float32)]
+
+        for i in range(0, len(player_crops), self.batch_size):
+            # torso bands resized straight to the input size into the reused batch array
+            crops, valid = get_torso_crops(player_crops[i:i+self.batch_size], self.input_size, out=self.crop_batch)
+
+            # BGR -> RGB, scale and normalize like the processor, NHWC -> NCHW
+            pixel_values = (crops[..., ::-1].astype(np.float32) / 255 - self.image_mean) / self.image_std
+            pixel_values = torch.from_numpy(np.ascontiguousarray(pixel_values.transpose(0, 3, 1, 2)))
+
+            with torch.inference_mode():
+                image_embeddings = self.model.get_image_features(pixel_values=pixel_values)
+            image_embeddings = image_embeddings / image_embeddings.norm(dim=-1, keepdim=True)
+
+            # softmax over CLIP's logits_per_image
+            logits_per_image = self.logit_scale * image_embeddings @ self.text_embeddings.T
+            batch_probabilities = logits_per_image.softmax(dim=1).numpy()
+            # an empty torso band is a black crop, it says nothing about the team
+            batch_probabilities[~valid] = 0.5
+            probabilities.append(batch_probabilities)
+
+        return np.concatenate(probabilities)
+
+    def vote_on_window(self, video_frames, player_tracks, start_frame):
+        # classify the crops the votes ask for in a window of frames, in batches
+        samples = self.team_votes.plan(player_tracks, start_frame)
+        # players whose torso is outside the frame can't vote, they are asked again in a later window
+        samples = [(i, player_id) for i, player_id in samples
+                   if get_torso_band(video_frames[i], player_tracks[i][player_id]["bbox"]).size > 0]
+        if not samples:
+            return
+
+        player_crops = [(video_frames[i], player_tracks[i][player_id]["bbox"]) for i, player_id in samples]
+        for (i, player_id), team_probabilities in zip(samples, self.get_player_probabilities(player_crops)):
+            self.team_votes.add(player_id, start_frame + i, team_probabilities)
+
+    def get_player_teams_across_frames(self, video_frames, player_tracks, read_from_stub=False, stub_path=None, start_frame=0):
+        # start_frame: index of video_frames[0] in the full video, used when called chunk by chunk
 
         player_assignment = read_stub(read_from_stub, stub_path)
         if player_assignment is not None:
@@ -70,17 +174,14 @@ class TeamAssigner:
 
         player_assignment = []
 
-        for frame_num, player_track in enumerate(player_tracks):
-            player_assignment.append({})
-
-            # correct every 50 frame
-            if frame_num % 50 == 0:
-                self.player_team_dict = {}
-
-            
-            for player_id, track in player_track.items():
-                team = self.get_player_team(video_frames[frame_num], track["bbox"], player_id)
-                player_assignment[frame_num][player_id] = team
+        # the votes are kept between calls, chunks have to come in order
+        for window_start in range(0, len(player_tracks), self.window_size):
+            window_end = window_start + self.window_size
+            self.vote_on_window(video_frames[window_start:window_end],
+                                player_tracks[window_start:window_end],
+                                start_frame + window_start)
+            for player_track in player_tracks[window_start:window_end]:
+                player_assignment.append({player_id: self.team_votes.get_team(player_id) for player_id in player_track})
 
         save_stub(stub_path, player_assignment)
         
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class TeamVotes:
+    """
+    Running, confidence-weighted team vote of every player track.
+
+    Each classified crop adds its team probabilities to the vote of its track and the
+    track belongs to the team with the larger total. A new track is sampled until it has
+    min_samples crops, at least sample_spacing frames apart so they show different
+    poses. After that it's only sampled again while its vote is ambiguous, i.e. while the
+    share of the leading team is below min_confidence. A single noisy crop can't flip a
+    track that has a few agreeing votes.
+    """
+    def __init__(self, min_samples=3, sample_spacing=15, min_confidence=0.7):
+        """
+        Args:
+            min_samples (int): Crops classified for every track before its vote is trusted.
+            sample_spacing (int): Minimum number of frames between two crops of a track.
+            min_confidence (float): Share of the votes the leading team needs, in (0.5, 1].
+        """
+        self.min_samples = min_samples
+        self.sample_spacing = sample_spacing
+        self.min_confidence = min_confidence
+        self.reset()
+
+    def reset(self):
+        # track id -> summed probabilities of team 1 and team 2
+        self.votes = {}
+        self.num_samples = {}
+        self.last_sample_frame = {}
+
+    def plan(self, player_tracks, start_frame=0):
+        """
+        Pick the crops to classify in a window of frames.
+
+        The decision for a track is based on its vote at the start of the window, the
+        crops picked in the window only count towards min_samples and sample_spacing.
+
+        Args:
+            player_tracks (list): Player tracks of the frames of the window.
+            start_frame (int): Frame number of player_tracks[0], frames have to come in order.
+
+        Returns:
+            list: (index in player_tracks, player id) of every crop to classify.
+        """
+        samples = []
+        num_samples = dict(self.num_samples)
+        last_sample_frame = dict(self.last_sample_frame)
+        for i, player_track in enumerate(player_tracks):
+            frame_num = start_frame + i
+            for player_id in player_track:
+                last_frame = last_sample_frame.get(player_id)
+                if last_frame is not None and frame_num - last_frame < self.sample_spacing:
+                    continue
+                if num_samples.get(player_id, 0) >= self.min_samples and \
+                        self.get_confidence(player_id) >= self.min_confidence:
+                    continue
+                samples.append((i, player_id))
+                num_samples[player_id] = num_samples.get(player_id, 0) + 1
+                last_sample_frame[player_id] = frame_num
+        return samples
+
+    def add(self, player_id, frame_num, team_probabilities):
+        """
+        Args:
+            player_id (int): Track id of the crop.
+            frame_num (int): Frame number of the crop.
+            team_probabilities (numpy.ndarray): Probabilities of team 1 and team 2.
+        """
+        self.votes[player_id] = self.votes.get(player_id, np.zeros(2)) + team_probabilities
+        self.num_samples[player_id] = self.num_samples.get(player_id, 0) + 1
+        self.last_sample_frame[player_id] = frame_num
+
+    def get_team(self, player_id):
+        # 1 or 2, None for a track without votes
+        votes = self.votes.get(player_id)
+        if votes is None:
+            return None
+        return 1 if votes[0] >= votes[1] else 2
+
+    def get_confidence(self, player_id):
+        # share of the votes of the leading team, 0 for a track without votes
+        votes = self.votes.get(player_id)
+        if votes is None or votes.sum() <= 0:
+            return 0.0
+        return float(votes.max() / votes.sum())
@@ -0,0 +1,55 @@
+import numpy as np
+import cv2
+
+# band of the player bbox with the shirt, without the head, the shorts and most of the arms
+TORSO_TOP = 0.2
+TORSO_BOTTOM = 0.55
+TORSO_SIDE = 0.25
+
+
+def get_torso_band(frame, bbox):
+    """
+    Args:
+        frame (numpy.ndarray): Frame of the player.
+        bbox (list): Player bbox, may reach outside the frame.
+
+    Returns:
+        numpy.ndarray: View of the torso band inside the frame, empty when it lies outside.
+    """
+    x1, y1, x2, y2 = bbox
+    height, width = y2 - y1, x2 - x1
+    # the ends are clamped too, a negative end would count from the far side of the frame
+    return frame[max(int(y1 + TORSO_TOP * height), 0):max(int(y1 + TORSO_BOTTOM * height), 0),
+                 max(int(x1 + TORSO_SIDE * width), 0):max(int(x2 - TORSO_SIDE * width), 0)]
+
+
+def get_torso_crops(player_crops, size, out=None):
+    """
+    Cut the torso band out of player bboxes and resize it to the classifier input.
+
+    Every band is resized with a single cv2.resize call straight into its slot of
+    the batch array, there is no intermediate copy or color conversion per crop.
+
+    Args:
+        player_crops (list): (frame, bbox) of every player.
+        size (int): Side of the square crops.
+        out (numpy.ndarray, optional): Preallocated uint8 array of at least (N, size, size, 3)
+            to write the crops into.
+
+    Returns:
+        tuple: (N, size, size, 3) BGR crops, a view of out when it is given, and the (N,) mask of
+            players whose torso band is not empty. Crops of empty bands are black.
+    """
+    if out is None:
+        out = np.empty((len(player_crops), size, size, 3), dtype=np.uint8)
+    crops = out[:len(player_crops)]
+    valid = np.ones(len(player_crops), dtype=bool)
+
+    for i, (frame, bbox) in enumerate(player_crops):
+        torso = get_torso_band(frame, bbox)
+        if torso.size == 0:
+            crops[i] = 0
+            valid[i] = False
+            continue
+        cv2.resize(torso, (size, size), dst=crops[i], interpolation=cv2.INTER_AREA)
+    return crops, valid
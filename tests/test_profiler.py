@@ -0,0 +1,46 @@
+import os
+import sys
+import types
+
+from utils.profiler import StageProfiler, PyinstrumentHook
+
+
+class FakeProfiler:
+    instances = []
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.running = False
+        self.starts = 0
+        FakeProfiler.instances.append(self)
+
+    def start(self):
+        assert not self.running
+        self.running = True
+        self.starts += 1
+
+    def stop(self):
+        assert self.running
+        self.running = False
+
+    def output_html(self):
+        return f"<html>{self.starts} blocks</html>"
+
+
+def test_pyinstrument_hook_writes_one_report_per_stage(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyinstrument", types.SimpleNamespace(Profiler=FakeProfiler))
+    FakeProfiler.instances = []
+    profiler = StageProfiler(hooks=[PyinstrumentHook(str(tmp_path))])
+
+    # nested like main.run, with a stage repeated like the chunks of a streaming run
+    with profiler.stage("total"):
+        for _ in range(2):
+            with profiler.stage("detection", 10):
+                pass
+        with profiler.stage("team_assignment", 20):
+            pass
+
+    assert sorted(os.listdir(tmp_path)) == ["detection.html", "team_assignment.html", "total.html"]
+    assert len(FakeProfiler.instances) == 3
+    assert not any(fake.running for fake in FakeProfiler.instances)
+    assert (tmp_path / "detection.html").read_text() == "<html>2 blocks</html>"
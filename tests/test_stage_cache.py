@@ -0,0 +1,26 @@
+import os
+
+from utils import StageCache, hash_file
+
+
+def test_file_hashes_are_shared_between_caches_and_pruned(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    video_path, weights_path = tmp_path / "video.mp4", tmp_path / "weights.pt"
+    video_path.write_bytes(b"video")
+    weights_path.write_bytes(b"weights")
+
+    # two caches on the same directory, like the workers of batch.py
+    first_cache, second_cache = StageCache(cache_dir), StageCache(cache_dir)
+    assert first_cache.hash_file(str(video_path)) == hash_file(str(video_path))
+    assert second_cache.hash_file(str(weights_path)) == hash_file(str(weights_path))
+    memo_dir = os.path.join(cache_dir, "file_hashes")
+    assert len(os.listdir(memo_dir)) == 2
+
+    # a changed or deleted file's hash is dropped, the other one is kept
+    video_path.write_bytes(b"another video")
+    os.utime(video_path, ns=(1, 1))
+    first_cache.put("stage-key", {"value": 1})
+    assert len(os.listdir(memo_dir)) == 1
+    weights_path.unlink()
+    second_cache.evict()
+    assert os.listdir(memo_dir) == []
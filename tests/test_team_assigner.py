@@ -0,0 +1,32 @@
+import numpy as np
+
+from team_assigner import TeamAssigner
+from team_assigner.torso_crops import get_torso_crops
+
+
+def test_torso_crop_of_bbox_partly_outside_frame_is_invalid():
+    frame = np.full((100, 100, 3), 200, dtype=np.uint8)
+    # the bbox starts left of the frame, its torso band ends left of it too
+    crops, valid = get_torso_crops([(frame, [-80, 10, 20, 90]), (frame, [20, 10, 60, 90])], 8)
+
+    assert valid.tolist() == [False, True]
+    assert not crops[0].any()
+
+
+def test_players_without_torso_in_frame_dont_vote():
+    frames = [np.full((100, 100, 3), 200, dtype=np.uint8)]
+    player_tracks = [{1: {"bbox": [-80, 10, 20, 90]}, 2: {"bbox": [20, 10, 60, 90]}}]
+
+    team_assigner = TeamAssigner()
+    classified = []
+
+    def get_player_probabilities(player_crops):
+        classified.extend(bbox for _, bbox in player_crops)
+        return np.array([[0.9, 0.1]] * len(player_crops))
+
+    team_assigner.get_player_probabilities = get_player_probabilities
+    team_assigner.vote_on_window(frames, player_tracks, 0)
+
+    assert classified == [[20, 10, 60, 90]]
+    assert team_assigner.team_votes.get_team(1) is None
+    assert team_assigner.team_votes.get_team(2) == 1
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class BallRoiPredictor:
+    """
+    Predict where the ball will be in the next frame and the region to search it in.
+
+    The ball center is extrapolated with the velocity between its last two detections.
+    A region is only predicted right after a frame where the ball was found, after a
+    miss the next frame has to be searched in full.
+    """
+    def __init__(self, roi_size):
+        """
+        Args:
+            roi_size (int): Side of the square search region in pixels.
+        """
+        self.roi_size = roi_size
+        self.reset()
+
+    def reset(self):
+        self.last_center = None
+        self.velocity = np.zeros(2)
+
+    def update(self, bbox):
+        """
+        Args:
+            bbox (list, optional): Ball bbox found in the current frame, None if it was missed.
+        """
+        if bbox is None:
+            self.reset()
+            return
+
+        center = np.array([(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2])
+        if self.last_center is not None:
+            self.velocity = center - self.last_center
+        self.last_center = center
+
+    def predict_roi(self, frame_shape):
+        """
+        Args:
+            frame_shape (tuple): Shape of the next frame.
+
+        Returns:
+            tuple: (x1, y1, x2, y2) of the region to search in the next frame, None to search the full frame.
+        """
+        height, width = frame_shape[:2]
+        if self.last_center is None or width <= self.roi_size or height <= self.roi_size:
+            return None
+
+        center_x, center_y = self.last_center + self.velocity
+        # keep the region inside the frame, shift it rather than cut it
+        x1 = int(min(max(center_x - self.roi_size / 2, 0), width - self.roi_size))
+        y1 = int(min(max(center_y - self.roi_size / 2, 0), height - self.roi_size))
+        return x1, y1, x1 + self.roi_size, y1 + self.roi_size
@@ -0,0 +1,83 @@
+from collections import deque
+
+
+class BallTrackBuffer:
+    """
+    Clean up and fill the ball track of a live feed one frame at a time.
+
+    Detections go through the same gate as BallTracker.remove_wrong_detections, which only
+    looks back. Gaps are filled linearly when the next detection shows up within
+    lookahead frames, otherwise the last position is held, so every frame is
+    returned exactly lookahead frames after it was pushed.
+    """
+    def __init__(self, lookahead=5, maximum_allowed_distance=25):
+        """
+        Args:
+            lookahead (int): Frames a frame is held back for, the longest gap that is interpolated.
+            maximum_allowed_distance (float): Pixels the ball may move per frame before a detection
+                is considered wrong.
+        """
+        self.lookahead = lookahead
+        self.maximum_allowed_distance = maximum_allowed_distance
+        self.reset()
+
+    def reset(self):
+        self.frame_num = 0
+        # (frame_num, bbox or None) of the frames not returned yet
+        self.pending = deque()
+        # (frame_num, bbox) of the last detection that passed the gate
+        self.last_good = None
+        # (frame_num, bbox) of the last detection that was returned
+        self.previous = None
+
+    def push(self, track):
+        """
+        Args:
+            track (dict): Ball track of the next frame, as returned by the detector.
+
+        Returns:
+            dict: Cleaned up ball track of the frame pushed lookahead frames ago, None while
+                the first lookahead frames are buffered.
+        """
+        bbox = track.get(1, {}).get("bbox") or None
+        if bbox is not None:
+            if self.last_good is not None:
+                last_good_frame_num, last_good_bbox = self.last_good
+                adjusted_max_distance = self.maximum_allowed_distance * (self.frame_num - last_good_frame_num)
+                distance = ((last_good_bbox[0] - bbox[0]) ** 2 + (last_good_bbox[1] - bbox[1]) ** 2) ** 0.5
+                if distance > adjusted_max_distance:
+                    bbox = None
+            if bbox is not None:
+                self.last_good = (self.frame_num, bbox)
+
+        self.pending.append((self.frame_num, bbox))
+        self.frame_num += 1
+        if len(self.pending) > self.lookahead:
+            return self._pop()
+        return None
+
+    def flush(self):
+        """
+        Returns:
+            list: Ball tracks of the buffered frames, at the end of the feed.
+        """
+        return [self._pop() for _ in range(len(self.pending))]
+
+    def _pop(self):
+        frame_num, bbox = self.pending.popleft()
+        if bbox is not None:
+            self.previous = (frame_num, bbox)
+            return {1: {"bbox": list(bbox)}}
+
+        following = next(((n, b) for n, b in self.pending if b is not None), None)
+        if self.previous is None:
+            # before the first detection, take the next one like a backfill
+            return {1: {"bbox": list(following[1])}} if following is not None else {}
+        if following is None:
+            # the gap is longer than the lookahead, hold the last position
+            return {1: {"bbox": list(self.previous[1])}}
+
+        previous_frame_num, previous_bbox = self.previous
+        following_frame_num, following_bbox = following
+        weight = (frame_num - previous_frame_num) / (following_frame_num - previous_frame_num)
+        return {1: {"bbox": [p + (f - p) * weight for p, f in zip(previous_bbox, following_bbox)]}}
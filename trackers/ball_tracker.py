@@ -1,27 +1,97 @@
-from ultralytics import YOLO
-import supervision as sv
+import math
 import numpy as np
-import pandas as pd
-import sys
-sys.path.append("../")
-from utils import read_stub, save_stub
+from utils import read_stub, save_stub, ModelBackend
+from utils.artifacts import FrameRecords
+from .ball_roi_predictor import BallRoiPredictor
+from .ball_track_buffer import BallTrackBuffer
 
 
 class BallTracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, conf=0.5, batch_size=20, roi_size=None, roi_min_confidence=0.6, backend=None, lookahead=5):
+        self.model_path = model_path
+        self.conf = conf
+        self.batch_size = batch_size
+        # torch, or an exported model on ONNX Runtime / OpenVINO
+        self.backend = backend if backend is not None else ModelBackend()
+        self.model = None
+        self.ball_class_id = None
+
+        # ROI mode: search the ball in a roi_size crop around its predicted position and
+        # fall back to the full frame after a miss or a detection below roi_min_confidence
+        self.roi_size = roi_size
+        self.roi_min_confidence = roi_min_confidence
+        self.roi_predictor = BallRoiPredictor(roi_size) if roi_size is not None else None
+
+        # online mode: cleanup and gap filling of update(), frames come out lookahead frames late
+        self.track_buffer = BallTrackBuffer(lookahead)
+
+    def load_model(self):
+        if self.model is not None:
+            return
+        self.model = self.backend.load(self.model_path)
+
+    def reset(self):
+        # the next frames don't continue the previous video
+        if self.roi_predictor is not None:
+            self.roi_predictor.reset()
+        self.track_buffer.reset()
 
 
     def detect_frames(self, frames):
-        batch_size = 20
         detections = []
-        for i in range(0, len(frames), batch_size):
-            batch_frames = frames[i:i+batch_size]
-            batch_detections = self.model.predict(batch_frames, conf=0.5)
-            detections += batch_detections
+        for i in range(0, len(frames), self.batch_size):
+            batch_frames = frames[i:i+self.batch_size]
+            detections += self.detect_batch(batch_frames)
         return detections 
+
+    def detect_batch(self, batch_frames):
+        self.load_model()
+        if self.roi_predictor is None:
+            return self.model.predict(batch_frames, conf=self.conf)
+
+        # in ROI mode every frame depends on the previous one, batches have to come in video order
+        # and the output is already the ball track of every frame
+        tracks = []
+        for frame in batch_frames:
+            bbox, confidence = None, 0
+            roi = self.roi_predictor.predict_roi(frame.shape)
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                detection = self.model.predict(frame[y1:y2, x1:x2], conf=self.conf, imgsz=self.roi_size)[0]
+                bbox, confidence = self.choose_ball(detection)
+                if bbox is not None:
+                    bbox = [bbox[0] + x1, bbox[1] + y1, bbox[2] + x1, bbox[3] + y1]
+
+            if bbox is None or confidence < self.roi_min_confidence:
+                detection = self.model.predict(frame, conf=self.conf)[0]
+                full_frame_bbox, full_frame_confidence = self.choose_ball(detection)
+                # a weak ball in the ROI still beats no ball in the full frame
+                if full_frame_bbox is not None and full_frame_confidence >= confidence:
+                    bbox, confidence = full_frame_bbox, full_frame_confidence
+
+            self.roi_predictor.update(bbox)
+            tracks.append({1: {"bbox": bbox}} if bbox is not None else {})
+        return tracks
     
 
+    def update(self, frame):
+        """
+        Detect the ball in the next frame of a live feed.
+
+        Args:
+            frame (numpy.ndarray): Next frame of the feed.
+
+        Returns:
+            dict: Cleaned up and interpolated ball track of the frame lookahead frames before
+                this one, None for the first lookahead frames. Call flush() at the end of the
+                feed for the remaining frames.
+        """
+        track = self.get_tracks_from_detections(self.detect_batch([frame]))[0]
+        return self.track_buffer.push(track)
+
+    def flush(self):
+        return self.track_buffer.flush()
+
     def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
 
         tracks = read_stub(read_from_stub, stub_path)
@@ -31,74 +101,113 @@ class BallTracker:
                 return tracks
         
         detections = self.detect_frames(frames)
+        tracks = self.get_tracks_from_detections(detections)
+
+        save_stub(stub_path, tracks)
+        return tracks
+
+    def get_tracks_from_detections(self, detections):
+        # in ROI mode detect_batch already gives the ball track of every frame
+        if self.roi_predictor is not None:
+            return list(detections)
+
         tracks = []
 
         for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
-            cls_names_inv = {v:k for k,v in cls_names.items()}
-
-            detection_supervision = sv.Detections.from_ultralytics(detection)
             tracks.append({})
-            chosen_bbox = None
-            max_confidence=0
-
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                confidence = frame_detection[2]
-
-                if cls_id == cls_names_inv["Ball"]:
-                    if max_confidence < confidence:
-                        chosen_bbox=bbox
-                        max_confidence=confidence
+            chosen_bbox, _ = self.choose_ball(detection)
             
             if chosen_bbox is not None:
                 tracks[frame_num][1] = {"bbox":chosen_bbox}
             
-        save_stub(stub_path, tracks)
         return tracks
+
+    def choose_ball(self, detection):
+        # most confident ball detection of a frame, (None, 0) if there is none
+        import supervision as sv
+
+        if self.ball_class_id is None:
+            # the class names are the same for every frame
+            cls_names_inv = {v:k for k,v in detection.names.items()}
+            self.ball_class_id = cls_names_inv["Ball"]
+
+        detection_supervision = sv.Detections.from_ultralytics(detection)
+        return self.choose_ball_from_detections(detection_supervision, self.ball_class_id)
+
+    def choose_ball_from_detections(self, detection_supervision, ball_class_id):
+        is_ball = detection_supervision.class_id == ball_class_id
+        if not is_ball.any():
+            return None, 0
+
+        # argmax keeps the first of equally confident balls, detections with confidence 0 don't count
+        confidences = detection_supervision.confidence[is_ball]
+        best = int(np.argmax(confidences))
+        if confidences[best] <= 0:
+            return None, 0
+        return detection_supervision.xyxy[is_ball][best].tolist(), float(confidences[best])
     
 
+    def get_ball_bboxes(self, ball_positions):
+        # (N, 4) bboxes of the ball, NaN in the frames without a detection, and the mask of detected frames
+        bboxes = np.full((len(ball_positions), 4), np.nan)
+        detected = np.zeros(len(ball_positions), dtype=bool)
+
+        if isinstance(ball_positions, FrameRecords):
+            # stored tracks, read the columns without building a dict per frame
+            is_ball = ball_positions.arrays["track_id"] == 1
+            frame_index = ball_positions.arrays["frame_index"][is_ball]
+            bboxes[frame_index] = ball_positions.arrays["bbox"][is_ball]
+            detected[frame_index] = True
+            return bboxes, detected
+
+        frame_nums, frame_bboxes = [], []
+        for i, track in enumerate(ball_positions):
+            bbox = track.get(1, {}).get("bbox", [])
+            if len(bbox) > 0:
+                frame_nums.append(i)
+                frame_bboxes.append(bbox)
+        if frame_nums:
+            bboxes[frame_nums] = frame_bboxes
+            detected[frame_nums] = True
+        return bboxes, detected
+
     def remove_wrong_detections(self, ball_positions):
 
         maximum_allowed_distance = 25  # maximum travled by 25 pixels
-        last_good_frame_index = -1
-
-        for i in range(len(ball_positions)):
-            current_bbox = ball_positions[i].get(1,{}).get("bbox", [])
-
-            if len(current_bbox) == 0:
-                continue
-
-            if last_good_frame_index == -1:  # first ball detection
-                last_good_frame_index = i
-                continue
-
-            last_good_box = ball_positions[last_good_frame_index].get(1,{}).get('bbox',[])
-            frame_gap = i - last_good_frame_index
-            adjusted_max_distance = maximum_allowed_distance * frame_gap
-
-            # calculate the distance between the last good bbox and the current position
+        bboxes, detected = self.get_ball_bboxes(ball_positions)
+
+        # only the detected frames are visited, each is compared with the last good one
+        frame_nums = np.flatnonzero(detected)
+        xs, ys = bboxes[frame_nums, 0].tolist(), bboxes[frame_nums, 1].tolist()
+        frame_nums = frame_nums.tolist()
+        wrong_frames = []
+        last_good = 0
+        for i in range(1, len(frame_nums)):
+            frame_gap = frame_nums[i] - frame_nums[last_good]
+            distance = math.sqrt((xs[last_good] - xs[i]) ** 2 + (ys[last_good] - ys[i]) ** 2)
             # if distance is more than the adjusted distance suppress detection
-            if np.linalg.norm(np.array(last_good_box[:2]) - np.array(current_bbox[:2])) > adjusted_max_distance:
-                # empty detection
-                ball_positions[i] = {}
+            if distance > maximum_allowed_distance * frame_gap:
+                wrong_frames.append(frame_nums[i])
             else:
-                last_good_frame_index = i
-        
+                last_good = i
+
+        ball_positions = list(ball_positions)  # tracks may be a read-only artifact
+        for frame_num in wrong_frames:
+            # empty detection
+            ball_positions[frame_num] = {}
         return ball_positions
     
 
     def interpolate_ball_positions(self, ball_positions):
-        ball_positions = [x.get(1,{}).get('bbox',[]) for x in ball_positions]  # if bbox empty > empty list
-        df_ball_positions = pd.DataFrame(ball_positions, columns=["x1",'y1','x2', 'y2'])
-
-
-        # interpolate missing values
-        df_ball_positions = df_ball_positions.interpolate()
-        df_ball_positions = df_ball_positions.bfill()
-
-        ball_positions = [{1:{"bbox":x}} for x in df_ball_positions.to_numpy().tolist() ]
-
-
-        return ball_positions
\ No newline at end of file
+        bboxes, _ = self.get_ball_bboxes(ball_positions)
+
+        # interpolate missing values linearly, np.interp holds the first and last value
+        # at the ends like a backfill and a forward fill
+        frame_nums = np.arange(len(bboxes))
+        for column in range(4):
+            values = bboxes[:, column]
+            missing = np.isnan(values)
+            if missing.any() and not missing.all():
+                values[missing] = np.interp(frame_nums[missing], frame_nums[~missing], values[~missing])
+
+        return [{1: {"bbox": bbox}} for bbox in bboxes.tolist()]
@@ -1,25 +1,50 @@
-from ultralytics import YOLO
-import supervision as sv
-import sys
-sys.path.append("../")
-from utils import read_stub, save_stub
+from utils import read_stub, save_stub, ModelBackend
 
 
 class PlayerTracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
-        self.tracker = sv.ByteTrack()
+    def __init__(self, model_path, conf=0.5, batch_size=20, backend=None):
+        self.model_path = model_path
+        self.conf = conf
+        self.batch_size = batch_size
+        # torch, or an exported model on ONNX Runtime / OpenVINO
+        self.backend = backend if backend is not None else ModelBackend()
+        self.model = None
+        # created on the first detections, supervision is only imported when it is needed
+        self.tracker = None
+
+    def load_model(self):
+        if self.model is not None:
+            return
+        self.model = self.backend.load(self.model_path)
+
+    def reset(self):
+        # forget the tracks of the previous video, the loaded model is kept
+        self.tracker = None
 
     # detect object inside each frame
     def detect_frames(self, frames):
-        batch_size = 20
         detections = []
-        for i in range(0, len(frames), batch_size):
-            batch_frames = frames[i:i+batch_size]
-            batch_detections = self.model.predict(batch_frames, conf=0.5)
-            detections += batch_detections
+        for i in range(0, len(frames), self.batch_size):
+            batch_frames = frames[i:i+self.batch_size]
+            detections += self.detect_batch(batch_frames)
         return detections 
+
+    def detect_batch(self, batch_frames):
+        self.load_model()
+        return self.model.predict(batch_frames, conf=self.conf)
     
+    def update(self, frame):
+        """
+        Detect and track the players in the next frame of a live feed.
+
+        Args:
+            frame (numpy.ndarray): Next frame of the feed.
+
+        Returns:
+            dict: Player tracks of the frame, without delay.
+        """
+        return self.get_tracks_from_detections(self.detect_batch([frame]))[0]
+
     # detects object inside the frame first then track them
     def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
 
@@ -30,11 +55,26 @@ class PlayerTracker:
                 return tracks
 
         detections = self.detect_frames(frames)
+        tracks = self.get_tracks_from_detections(detections)
+
+        save_stub(stub_path, tracks)
+        
+        return tracks
+
+    def get_tracks_from_detections(self, detections):
+        # detections have to come in frame order, the tracker keeps state between calls
+        import supervision as sv
+
+        if self.tracker is None:
+            self.tracker = sv.ByteTrack()
         tracks = []
+        player_class_id = None
 
-        for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
-            cls_names_inv = {v:k for k,v in cls_names.items()}
+        for detection in detections:
+            if player_class_id is None:
+                # the class names are the same for every frame
+                cls_names_inv = {v:k for k,v in detection.names.items()}
+                player_class_id = cls_names_inv["Player"]
 
             detection_supervision = sv.Detections.from_ultralytics(detection)
 
@@ -42,16 +82,13 @@ class PlayerTracker:
             detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
 
             # key: player id, value: bounding boxes
-            tracks.append({})
-
-            for frame_detection in detection_with_tracks:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                track_id = frame_detection[4]
+            tracks.append(self.get_player_tracks(detection_with_tracks, player_class_id))
 
-                if cls_id == cls_names_inv["Player"]:
-                    tracks[frame_num][track_id] = {"bbox": bbox}
-
-        save_stub(stub_path, tracks)
-        
         return tracks
+
+    def get_player_tracks(self, detection_with_tracks, player_class_id):
+        # select the players with a mask and convert their rows in one go
+        is_player = detection_with_tracks.class_id == player_class_id
+        bboxes = detection_with_tracks.xyxy[is_player].tolist()
+        track_ids = detection_with_tracks.tracker_id[is_player].tolist()
+        return {track_id: {"bbox": bbox} for track_id, bbox in zip(track_ids, bboxes)}
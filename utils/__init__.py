@@ -1,3 +1,7 @@
-from .video_utils import read_video, save_video
+from .video_utils import read_video, iter_video_frames, read_video_chunks, get_video_frame_count, get_video_fps, resolve_frame_range, save_video
 from .stubs_utils import read_stub, save_stub
+from .file_utils import hash_file
+from .stage_cache import StageCache
+from .profiler import StageProfiler, StageHook, PyinstrumentHook
+from .model_backend import ModelBackend, BACKENDS
 from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance, get_center_of_bbox, get_foot_position
\ No newline at end of file
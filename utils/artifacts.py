@@ -0,0 +1,370 @@
+"""
+A columnar, memory-mappable storage format for per-frame pipeline outputs.
+
+Tracks, team assignments and court keypoints are stored as a directory of .npy
+arrays (one row per record, e.g. one row per tracked player per frame) plus a
+small meta.json. The arrays are memory-mapped on load, so loading costs almost
+nothing, needs no torch, and the per-frame dicts/keypoints are only built when
+a frame is accessed.
+
+Layout of an artifact directory:
+    meta.json          kind, number of frames and format version
+    frame_offsets.npy  (num_frames + 1,) rows of frame i are [offsets[i], offsets[i+1])
+    frame_index.npy    (num_rows,) frame of every row
+    tracks:      track_id.npy (num_rows,), bbox.npy (num_rows, 4)
+    assignments: track_id.npy (num_rows,), team.npy (num_rows,)
+    keypoints:   xy.npy (num_rows, K, 2), xyn.npy (num_rows, K, 2), conf.npy (num_rows, K)
+"""
+
+import argparse
+import errno
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+ARTIFACT_VERSION = 1
+
+
+class CourtKeypoints:
+    """
+    Numpy stand-in for the ultralytics Keypoints of one frame.
+
+    Exposes the attributes and methods the pipeline uses (xy, xyn, conf,
+    orig_shape, cpu(), numpy()), so stored keypoints can be used without torch.
+    visible and class_id are what the supervision key point annotators look for,
+    there is no visibility or class information so both are None.
+    """
+    visible = None
+    class_id = None
+
+    def __init__(self, xy, xyn, conf, orig_shape):
+        self.xy = xy
+        self.xyn = xyn
+        self.conf = conf
+        self.orig_shape = orig_shape
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+    def __len__(self):
+        return len(self.xy)
+
+
+class FrameRecords:
+    """
+    Read-only, list-like view over a stored artifact, one item per frame.
+
+    Indexing builds the item of a single frame from the memory-mapped arrays,
+    slicing returns a list of items.
+    """
+    def __init__(self, kind, arrays, meta):
+        self.kind = kind
+        self.arrays = arrays
+        self.meta = meta
+        self.frame_offsets = arrays["frame_offsets"]
+
+    def __len__(self):
+        return len(self.frame_offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame index out of range")
+
+        start, end = int(self.frame_offsets[index]), int(self.frame_offsets[index+1])
+        if self.kind == "tracks":
+            track_ids = self.arrays["track_id"][start:end].tolist()
+            bboxes = self.arrays["bbox"][start:end].tolist()
+            return {track_id: {"bbox": bbox} for track_id, bbox in zip(track_ids, bboxes)}
+        if self.kind == "assignments":
+            track_ids = self.arrays["track_id"][start:end].tolist()
+            teams = self.arrays["team"][start:end].tolist()
+            return dict(zip(track_ids, teams))
+
+        return CourtKeypoints(self.arrays["xy"][start:end],
+                              self.arrays["xyn"][start:end],
+                              self.arrays["conf"][start:end],
+                              tuple(self.meta["orig_shape"]))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __deepcopy__(self, memo):
+        # load the arrays into writable memory, the copy may be modified in place
+        arrays = {name: np.array(array) for name, array in self.arrays.items()}
+        return FrameRecords(self.kind, arrays, dict(self.meta))
+
+
+def get_artifact_kind(records):
+    """
+    Guess which artifact kind a list of per-frame records can be stored as.
+
+    Args:
+        records (list): Per-frame tracks, team assignments or keypoints.
+
+    Returns:
+        str: "tracks", "assignments" or "keypoints", None if the records can't be stored columnar.
+    """
+    if isinstance(records, FrameRecords):
+        return records.kind
+    if not isinstance(records, list):
+        return None
+
+    for frame_records in records:
+        if hasattr(frame_records, "xy"):
+            return "keypoints"
+        if not isinstance(frame_records, dict):
+            return None
+        for value in frame_records.values():
+            if isinstance(value, dict):
+                return "tracks" if "bbox" in value and len(value) == 1 else None
+            if isinstance(value, (int, np.integer)):
+                return "assignments"
+            return None
+
+    # every frame is empty, all kinds store that the same way
+    return "tracks"
+
+
+def stack_tracks(tracks, num_frames=None):
+    """
+    Stack the bboxes of per-frame tracks into arrays, one row per tracked object.
+
+    Stored tracks are read from their columns without building the per-frame dicts.
+
+    Args:
+        tracks (list or FrameRecords): Per-frame tracks, {track_id: {"bbox": bbox}}.
+        num_frames (int, optional): Only stack the first num_frames frames.
+
+    Returns:
+        tuple: (frame_index, track_id, bbox) with shapes (N,), (N,) and (N, 4), in frame
+            order and in the order of the tracks within a frame. Empty bboxes are skipped.
+    """
+    if num_frames is None:
+        num_frames = len(tracks)
+
+    if isinstance(tracks, FrameRecords) and tracks.kind == "tracks":
+        end = int(tracks.frame_offsets[min(num_frames, len(tracks))])
+        return (np.asarray(tracks.arrays["frame_index"][:end], dtype=np.int64),
+                np.asarray(tracks.arrays["track_id"][:end], dtype=np.int64),
+                np.asarray(tracks.arrays["bbox"][:end], dtype=np.float64))
+
+    frame_index, track_ids, bboxes = [], [], []
+    for frame_num in range(min(num_frames, len(tracks))):
+        for track_id, track in tracks[frame_num].items():
+            bbox = track.get("bbox", [])
+            if len(bbox) == 0:
+                continue
+            frame_index.append(frame_num)
+            track_ids.append(track_id)
+            bboxes.append(bbox)
+    return (np.asarray(frame_index, dtype=np.int64),
+            np.asarray(track_ids, dtype=np.int64),
+            np.asarray(bboxes, dtype=np.float64).reshape(-1, 4))
+
+
+def save_artifact(path, records, kind=None):
+    """
+    Store per-frame records as a columnar artifact directory.
+
+    The directory is written next to its final location and renamed into place,
+    so readers never see a partially written artifact.
+
+    Args:
+        path (str): Artifact directory to create, replaced if it exists.
+        records (list): Per-frame tracks, team assignments or keypoints.
+        kind (str, optional): Artifact kind, guessed from the records when None.
+    """
+    if kind is None:
+        kind = get_artifact_kind(records)
+    if kind is None:
+        raise ValueError("Records can't be stored as a columnar artifact")
+
+    if kind == "keypoints":
+        arrays, meta = _keypoints_to_arrays(records)
+    else:
+        arrays, meta = _dicts_to_arrays(records, kind)
+    meta.update({"kind": kind, "num_frames": len(records), "version": ARTIFACT_VERSION})
+
+    parent_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent_dir, suffix=".tmp")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # an existing artifact is moved out of the way as a whole and the rename retried,
+        # another process may be replacing the same path at the same time
+        while True:
+            try:
+                os.replace(tmp_dir, path)
+                break
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+                remove_artifact(path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_artifact(path):
+    """
+    Memory-map a columnar artifact directory.
+
+    Args:
+        path (str): Artifact directory written by save_artifact.
+
+    Returns:
+        FrameRecords: List-like view with one item per frame.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact version {meta.get('version')} in {path}")
+
+    arrays = {}
+    for file_name in os.listdir(path):
+        if file_name.endswith(".npy"):
+            arrays[file_name[:-4]] = np.load(os.path.join(path, file_name), mmap_mode="r")
+    return FrameRecords(meta["kind"], arrays, meta)
+
+
+def remove_artifact(path):
+    """
+    Delete an artifact directory.
+
+    The directory is renamed out of the way before it is deleted, so readers see either
+    the whole artifact or none. Nothing happens if another process removed it first.
+
+    Args:
+        path (str): Artifact directory to delete.
+    """
+    aside_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        os.replace(path, os.path.join(aside_dir, "artifact"))
+    except FileNotFoundError:
+        pass
+    finally:
+        shutil.rmtree(aside_dir, ignore_errors=True)
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def convert_stub(stub_path, artifact_path):
+    """
+    Convert a pickled stub (list of per-frame records) into a columnar artifact.
+
+    Args:
+        stub_path (str): Path of the pickle stub.
+        artifact_path (str): Artifact directory to write.
+
+    Returns:
+        str: Kind of the written artifact.
+    """
+    with open(stub_path, "rb") as f:
+        records = pickle.load(f)
+    kind = get_artifact_kind(records)
+    save_artifact(artifact_path, records, kind)
+    return kind
+
+
+def _frame_offsets(counts):
+    frame_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=frame_offsets[1:])
+    frame_index = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    return frame_offsets, frame_index
+
+
+def _compact_float(values):
+    # detector outputs are float32, keep float64 only if float32 would lose precision
+    values = np.asarray(values, dtype=np.float64)
+    values_32 = values.astype(np.float32)
+    if np.array_equal(values_32, values, equal_nan=True):
+        return values_32
+    return values
+
+
+def _dicts_to_arrays(records, kind):
+    counts = [len(frame_records) for frame_records in records]
+    frame_offsets, frame_index = _frame_offsets(counts)
+
+    track_ids = [track_id for frame_records in records for track_id in frame_records]
+    arrays = {
+        "frame_offsets": frame_offsets,
+        "frame_index": frame_index,
+        "track_id": np.asarray(track_ids, dtype=np.int64),
+    }
+    if kind == "tracks":
+        bboxes = [value["bbox"] for frame_records in records for value in frame_records.values()]
+        arrays["bbox"] = _compact_float(np.reshape(bboxes, (-1, 4)))
+    else:
+        teams = [value for frame_records in records for value in frame_records.values()]
+        arrays["team"] = np.asarray(teams, dtype=np.int8)
+    return arrays, {}
+
+
+def _keypoints_to_arrays(records):
+    xy, xyn, conf = [], [], []
+    orig_shape = None
+    for keypoints in records:
+        keypoints = keypoints.cpu().numpy()
+        frame_xy = np.asarray(keypoints.xy, dtype=np.float32)
+        xy.append(frame_xy)
+        xyn.append(np.asarray(keypoints.xyn, dtype=np.float32))
+        if keypoints.conf is None:
+            conf.append(np.full(frame_xy.shape[:2], np.nan, dtype=np.float32))
+        else:
+            conf.append(np.asarray(keypoints.conf, dtype=np.float32))
+        if orig_shape is None:
+            orig_shape = [int(size) for size in keypoints.orig_shape]
+
+    counts = [len(frame_xy) for frame_xy in xy]
+    frame_offsets, frame_index = _frame_offsets(counts)
+    num_keypoints = max((frame_xy.shape[1] for frame_xy in xy), default=0)
+
+    def stack(frame_arrays, row_shape):
+        # frames without a detection add no rows, their shape may not match the other frames
+        frame_arrays = [frame_array for frame_array in frame_arrays if len(frame_array)]
+        if not frame_arrays:
+            return np.zeros((0, *row_shape), dtype=np.float32)
+        return np.concatenate(frame_arrays)
+
+    arrays = {
+        "frame_offsets": frame_offsets,
+        "frame_index": frame_index,
+        "xy": stack(xy, (num_keypoints, 2)),
+        "xyn": stack(xyn, (num_keypoints, 2)),
+        "conf": stack(conf, (num_keypoints,)),
+    }
+    return arrays, {"orig_shape": orig_shape or [0, 0]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert pickled stubs into columnar artifacts")
+    parser.add_argument("stub_paths", type=str, nargs="+", help="pickle stubs to convert")
+    parser.add_argument("--output_dir", type=str, default=None, help="directory for the artifacts, defaults to next to each stub")
+    args = parser.parse_args()
+
+    for stub_path in args.stub_paths:
+        artifact_name = os.path.splitext(os.path.basename(stub_path))[0]
+        artifact_dir = args.output_dir or os.path.dirname(stub_path)
+        artifact_path = os.path.join(artifact_dir, artifact_name)
+        kind = convert_stub(stub_path, artifact_path)
+        print(f"{stub_path} -> {artifact_path} ({kind})")
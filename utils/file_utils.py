@@ -0,0 +1,10 @@
+import hashlib
+
+
+def hash_file(path):
+    # SHA-256 hex digest of the file content, read in 1 MB blocks
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
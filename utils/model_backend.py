@@ -0,0 +1,214 @@
+"""
+Pluggable inference backends for the YOLO models.
+
+"torch" runs the weights as they are. "onnx" and "openvino" export the weights
+once, cache the export on disk next to a hash of the weights, and run it through
+ONNX Runtime or OpenVINO. All backends return ultralytics Results, so the
+detectors' post-processing is the same for every backend. ultralytics and the
+runtimes are only imported when a model is loaded.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from .file_utils import hash_file
+
+BACKENDS = ["torch", "onnx", "openvino"]
+
+
+class ModelBackend:
+    def __init__(self, name="torch", export_dir="exported_models", intra_op_threads=None, inter_op_threads=None):
+        """
+        Args:
+            name (str): "torch", "onnx" or "openvino".
+            export_dir (str): Directory the exported models are cached in.
+            intra_op_threads (int, optional): Threads used inside one operator, runtime default when None.
+            inter_op_threads (int, optional): Operators run at the same time (OpenVINO streams),
+                runtime default when None.
+        """
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown backend {name}, choose from {BACKENDS}")
+        self.name = name
+        self.export_dir = export_dir
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+    def load(self, model_path):
+        """
+        Load a YOLO model on this backend, exporting it first if there is no cached export.
+
+        Args:
+            model_path (str): Path of the .pt weights.
+
+        Returns:
+            ultralytics.YOLO: Model with the usual predict() interface.
+        """
+        from ultralytics import YOLO
+
+        if self.name == "torch":
+            self._configure_torch_threads()
+            return YOLO(model_path)
+
+        exported_path = self.get_exported_path(model_path)
+        if not os.path.exists(exported_path):
+            self.export(model_path, exported_path)
+
+        model = YOLO(exported_path)
+        self._configure_runtime_threads(model, exported_path)
+        return model
+
+    def get_exported_path(self, model_path):
+        # the export is keyed by the content of the weights, retrained weights get a new export
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        export_name = f"{name}-{hash_file(model_path)[:16]}"
+        if self.name == "onnx":
+            return os.path.join(self.export_dir, f"{export_name}.onnx")
+        # ultralytics recognizes OpenVINO models by the directory suffix
+        return os.path.join(self.export_dir, f"{export_name}_openvino_model")
+
+    def export(self, model_path, exported_path):
+        from ultralytics import YOLO
+
+        # export a copy of the weights in a private directory, exports write next to the weights
+        # and another process may be exporting the same weights at the same time
+        os.makedirs(self.export_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.export_dir, suffix=".tmp")
+        try:
+            tmp_model_path = os.path.join(tmp_dir, os.path.basename(model_path))
+            shutil.copyfile(model_path, tmp_model_path)
+            # dynamic shapes: the batch size and the input size (ROI crops) change between calls
+            tmp_exported_path = YOLO(tmp_model_path).export(format=self.name, dynamic=True)
+            try:
+                os.replace(tmp_exported_path, exported_path)
+            except OSError:
+                # a directory can't replace an existing one, another process finished first
+                if not os.path.exists(exported_path):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _configure_torch_threads(self):
+        import torch
+
+        if self.intra_op_threads is not None:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads is not None:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:
+                # can only be set before the first parallel work, e.g. by an earlier model
+                pass
+
+    def _configure_runtime_threads(self, model, exported_path):
+        if self.intra_op_threads is None and self.inter_op_threads is None:
+            return
+
+        # ultralytics creates the runtime session on the first prediction with default
+        # options, recreate it with the thread settings
+        model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+        backend = getattr(getattr(model, "predictor", None), "model", None)
+
+        if self.name == "onnx" and hasattr(backend, "session"):
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            if self.intra_op_threads is not None:
+                options.intra_op_num_threads = self.intra_op_threads
+            if self.inter_op_threads is not None:
+                options.inter_op_num_threads = self.inter_op_threads
+                options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+            backend.session = onnxruntime.InferenceSession(exported_path,
+                                                           sess_options=options,
+                                                           providers=backend.session.get_providers())
+        elif self.name == "openvino" and hasattr(backend, "ov_compiled_model"):
+            import openvino
+
+            config = {}
+            if self.intra_op_threads is not None:
+                config["INFERENCE_NUM_THREADS"] = self.intra_op_threads
+            if self.inter_op_threads is not None:
+                config["NUM_STREAMS"] = self.inter_op_threads
+            core = openvino.Core()
+            xml_path = glob.glob(os.path.join(exported_path, "*.xml"))[0]
+            backend.ov_compiled_model = core.compile_model(core.read_model(xml_path), "CPU", config)
+        else:
+            print(f"Thread settings are not supported for the {self.name} backend of this ultralytics version, using the runtime defaults")
+
+
+def compare_backends(model_path, frames, backend, conf=0.5, min_iou=0.5):
+    """
+    Run a model on torch and on another backend and match their detections.
+
+    Args:
+        model_path (str): Path of the .pt weights.
+        frames (list): Frames to run both models on.
+        backend (ModelBackend): Backend to compare with torch.
+        conf (float): Confidence threshold of both models.
+        min_iou (float): Detections of the same class overlapping less than this don't match.
+
+    Returns:
+        dict: matched and unmatched detection counts and the largest bbox coordinate difference
+            in pixels between matched detections.
+    """
+    reference_model = ModelBackend("torch").load(model_path)
+    model = backend.load(model_path)
+
+    matched, unmatched, max_difference = 0, 0, 0.0
+    for frame in frames:
+        reference = reference_model.predict(frame, conf=conf, verbose=False)[0].boxes
+        result = model.predict(frame, conf=conf, verbose=False)[0].boxes
+        reference_boxes, reference_classes = reference.xyxy.cpu().numpy(), reference.cls.cpu().numpy()
+        boxes, classes = result.xyxy.cpu().numpy(), result.cls.cpu().numpy()
+
+        frame_matched = 0
+        for box, cls in zip(reference_boxes, reference_classes):
+            candidates = boxes[classes == cls]
+            ious = _iou(box, candidates) if len(candidates) else np.zeros(0)
+            if len(ious) == 0 or ious.max() < min_iou:
+                continue
+            best = int(np.argmax(ious))
+            frame_matched += 1
+            max_difference = max(max_difference, float(np.abs(candidates[best] - box).max()))
+
+        matched += frame_matched
+        # detections missing on either side
+        unmatched += (len(reference_boxes) - frame_matched) + max(len(boxes) - frame_matched, 0)
+
+    return {"matched": matched, "unmatched": unmatched, "max_bbox_difference": max_difference}
+
+
+def _iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+if __name__ == "__main__":
+    from .video_utils import read_video
+
+    parser = argparse.ArgumentParser(description="Check that an exported model detects the same as the torch weights")
+    parser.add_argument("model_path", type=str, help=".pt weights")
+    parser.add_argument("video_path", type=str, help="video to compare the detections on")
+    parser.add_argument("--backend", type=str, choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--export_dir", type=str, default="exported_models")
+    parser.add_argument("--frames", type=int, default=50, help="number of frames to compare")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="largest allowed bbox coordinate difference in pixels")
+    args = parser.parse_args()
+
+    frames = read_video(args.video_path, end_frame=args.frames)
+    comparison = compare_backends(args.model_path, frames, ModelBackend(args.backend, args.export_dir))
+    print(comparison)
+    if comparison["unmatched"] or comparison["max_bbox_difference"] > args.tolerance:
+        print(f"{args.backend} detections differ from torch by more than the tolerance", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,235 @@
+"""
+Per-stage timing and memory instrumentation for the pipeline.
+
+Every stage records how long it took for how many frames. The report gives the
+total time, frames per second, per-frame latency percentiles and the peak RSS of
+the process at the end of each stage, as JSON for tracking regressions and as a
+table for reading. Hooks are called when a stage starts and ends, e.g. to run a
+sampling profiler over a single stage.
+"""
+
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class StageHook:
+    """
+    Base class for stage hooks, override the methods you need.
+    """
+    def on_stage_start(self, stage_name):
+        pass
+
+    def on_stage_end(self, stage_name):
+        pass
+
+
+class PyinstrumentHook(StageHook):
+    """
+    Run the pyinstrument sampling profiler over every stage and write one HTML report per stage.
+
+    Every stage has its own profiler, so nested stages (e.g. detection inside the whole
+    run) each get a report. Repeated blocks of a stage, like the chunks of a streaming
+    run, are sampled by the same profiler and add up in its report.
+    """
+    def __init__(self, output_dir, interval=0.001):
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("pyinstrument is needed for the sampling profiler, pip install pyinstrument") from e
+
+        self.profiler_class = Profiler
+        self.output_dir = output_dir
+        self.interval = interval
+        # stage name -> profiler, and the stages being sampled right now
+        self.profilers = {}
+        self.active_stages = set()
+
+    def on_stage_start(self, stage_name):
+        # the sampler only sees the thread that started it, stages of the decode/encode threads are skipped
+        if stage_name in self.active_stages or threading.current_thread() is not threading.main_thread():
+            return
+        if stage_name not in self.profilers:
+            self.profilers[stage_name] = self.profiler_class(interval=self.interval)
+        self.active_stages.add(stage_name)
+        self.profilers[stage_name].start()
+
+    def on_stage_end(self, stage_name):
+        if stage_name not in self.active_stages or threading.current_thread() is not threading.main_thread():
+            return
+        self.active_stages.remove(stage_name)
+        profiler = self.profilers[stage_name]
+        profiler.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, f"{stage_name}.html"), "w") as f:
+            f.write(profiler.output_html())
+
+
+class StageProfiler:
+    def __init__(self, enabled=True, hooks=None):
+        """
+        Args:
+            enabled (bool): A disabled profiler records nothing and costs next to nothing.
+            hooks (list, optional): StageHook instances called around every stage.
+        """
+        self.enabled = enabled
+        self.hooks = list(hooks or [])
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage_name, num_frames=0):
+        """
+        Time a block of code as (part of) a stage.
+
+        Args:
+            stage_name (str): Name of the stage, repeated blocks with the same name add up.
+            num_frames (int): Number of frames the block processed.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        for hook in self.hooks:
+            hook.on_stage_start(stage_name)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage_name, time.perf_counter() - start_time, num_frames)
+            for hook in self.hooks:
+                hook.on_stage_end(stage_name)
+
+    def record(self, stage_name, seconds, num_frames=1):
+        """
+        Add a measurement to a stage, safe to call from the decode/encode threads.
+
+        Args:
+            stage_name (str): Name of the stage.
+            seconds (float): Time spent.
+            num_frames (int): Number of frames processed in that time.
+        """
+        if not self.enabled:
+            return
+
+        peak_rss_mb = get_peak_rss_mb()
+        with self.lock:
+            stats = self.stages.setdefault(stage_name, {
+                "calls": 0,
+                "frames": 0,
+                "seconds": 0.0,
+                "frame_latencies": [],
+                "peak_rss_mb": None,
+            })
+            stats["calls"] += 1
+            stats["frames"] += num_frames
+            stats["seconds"] += seconds
+            if num_frames > 0:
+                stats["frame_latencies"] += [seconds / num_frames] * num_frames
+            if peak_rss_mb is not None:
+                stats["peak_rss_mb"] = max(stats["peak_rss_mb"] or 0.0, peak_rss_mb)
+
+    def report(self):
+        """
+        Returns:
+            dict: JSON serializable report with the environment and one entry per stage, in the order
+                the stages first ran.
+        """
+        stages = {}
+        with self.lock:
+            for stage_name, stats in self.stages.items():
+                latencies = sorted(stats["frame_latencies"])
+                stages[stage_name] = {
+                    "calls": stats["calls"],
+                    "frames": stats["frames"],
+                    "seconds": stats["seconds"],
+                    "fps": stats["frames"] / stats["seconds"] if stats["frames"] and stats["seconds"] > 0 else None,
+                    "latency_ms_p50": _percentile(latencies, 50) * 1000 if latencies else None,
+                    "latency_ms_p90": _percentile(latencies, 90) * 1000 if latencies else None,
+                    "latency_ms_p99": _percentile(latencies, 99) * 1000 if latencies else None,
+                    "peak_rss_mb": stats["peak_rss_mb"],
+                }
+
+        return {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stages": stages,
+        }
+
+    def save_json(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def format_table(self):
+        columns = ["stage", "frames", "seconds", "fps", "p50 ms", "p90 ms", "p99 ms", "peak RSS MB"]
+        rows = []
+        for stage_name, stats in self.report()["stages"].items():
+            rows.append([
+                stage_name,
+                str(stats["frames"]),
+                f"{stats['seconds']:.3f}",
+                _format_optional(stats["fps"], "{:.1f}"),
+                _format_optional(stats["latency_ms_p50"], "{:.2f}"),
+                _format_optional(stats["latency_ms_p90"], "{:.2f}"),
+                _format_optional(stats["latency_ms_p99"], "{:.2f}"),
+                _format_optional(stats["peak_rss_mb"], "{:.0f}"),
+            ])
+
+        widths = [max(len(row[i]) for row in [columns] + rows) for i in range(len(columns))]
+        lines = ["  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                           for i, (cell, width) in enumerate(zip(row, widths)))
+                 for row in [columns] + rows]
+        lines.insert(1, "  ".join("-" * width for width in widths))
+        return "\n".join(lines)
+
+
+def get_peak_rss_mb():
+    """
+    Returns:
+        float: Peak resident set size of the process so far in MB, None if it can't be measured.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    if sys.platform == "darwin":
+        return peak_rss / 1024**2
+    return peak_rss / 1024
+
+
+def get_rss_mb():
+    """
+    Returns:
+        float: Current resident set size of the process in MB, the peak RSS where the
+            current one can't be read, None if neither can be measured.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, IndexError):
+        return get_peak_rss_mb()
+
+
+def _percentile(sorted_values, percentile):
+    # nearest-rank percentile of an already sorted list
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def _format_optional(value, value_format):
+    return "-" if value is None else value_format.format(value)
@@ -0,0 +1,234 @@
+"""
+A content-addressed cache for the results of pipeline stages.
+
+Entries are keyed by a hash of everything a stage depends on: the input video,
+the model weights, the stage parameters and the keys of the upstream stages.
+A changed input gives a new key, so a stale result is never reused. Entries are
+written atomically and the least recently used ones are evicted once the cache
+grows past its size budget. Tracks, team assignments and keypoints are stored as
+memory-mapped columnar artifacts, anything else is pickled.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from .file_utils import hash_file
+from .artifacts import get_artifact_kind, save_artifact, load_artifact, remove_artifact, is_artifact
+
+
+class StageCache:
+    def __init__(self, cache_dir, max_size_bytes=20 * 1024**3):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries.
+            max_size_bytes (int): Size budget, least recently used entries are evicted above it.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        # one small file per hashed file, concurrent runs never rewrite each other's hashes
+        self.file_hashes_dir = os.path.join(cache_dir, "file_hashes")
+
+    def hash_file(self, path):
+        """
+        Hash the content of a file, e.g. the input video or model weights.
+
+        Hashes are remembered per (path, size, mtime) so a large video is only read once.
+        Remembered hashes of files that were changed or deleted are pruned by evict().
+
+        Args:
+            path (str): Path of the file to hash.
+
+        Returns:
+            str: Hex digest of the file content.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        file_id = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+        memo_path = os.path.join(self.file_hashes_dir, f"{hashlib.sha256(file_id.encode()).hexdigest()}.json")
+
+        memo = self._read_file_hash(memo_path)
+        if memo is not None and memo["file_id"] == file_id:
+            return memo["hash"]
+
+        file_hash = hash_file(path)
+
+        memo = {"file_id": file_id, "path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash}
+        self._atomic_write(memo_path, json.dumps(memo).encode())
+        return file_hash
+
+    def make_key(self, stage_name, params, upstream_keys=()):
+        """
+        Build the cache key of a stage.
+
+        Args:
+            stage_name (str): Name of the stage, also used in the entry file name.
+            params (dict): JSON serializable parameters the stage output depends on,
+                including hashes of its input files.
+            upstream_keys (iterable): Keys of the stages whose outputs this stage consumes.
+
+        Returns:
+            str: Cache key.
+        """
+        description = json.dumps({"stage": stage_name,
+                                  "params": params,
+                                  "upstream": list(upstream_keys)},
+                                 sort_keys=True)
+        return f"{stage_name}-{hashlib.sha256(description.encode()).hexdigest()}"
+
+    def get(self, key):
+        """
+        Read a cached stage result.
+
+        Args:
+            key (str): Key returned by make_key.
+
+        Returns:
+            object: Cached result, or None if there is no valid entry for the key.
+        """
+        artifact_path = self._artifact_path(key)
+        if is_artifact(artifact_path):
+            try:
+                records = load_artifact(artifact_path)
+            except FileNotFoundError:
+                # evicted or replaced by another process while it was read
+                return None
+            self._touch(artifact_path)
+            return records
+
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError):
+            # entries are written atomically, but don't trust a damaged file either
+            self._remove(entry_path)
+            return None
+
+        self._touch(entry_path)
+        return value
+
+    def put(self, key, value):
+        """
+        Store a stage result and evict old entries if the cache is over budget.
+
+        Args:
+            key (str): Key returned by make_key.
+            value (object): Picklable stage result.
+        """
+        if get_artifact_kind(value) is not None:
+            entry_path = self._artifact_path(key)
+            save_artifact(entry_path, value)
+        else:
+            entry_path = self._entry_path(key)
+            self._atomic_write(entry_path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self._touch(entry_path)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits its size budget.
+
+        Args:
+            keep (str, optional): Key that must not be evicted, e.g. the entry just written.
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            if file_name.endswith(".tmp"):
+                # entry another process is still writing
+                continue
+            try:
+                if file_name.endswith(".pkl"):
+                    size = os.stat(path).st_size
+                elif is_artifact(path):
+                    size = sum(os.stat(os.path.join(path, name)).st_size for name in os.listdir(path))
+                else:
+                    continue
+                entries.append((os.stat(path).st_mtime_ns, size, path))
+            except FileNotFoundError:
+                # other processes share the cache, the entry was evicted or replaced meanwhile
+                continue
+
+        self._prune_file_hashes()
+
+        total_size = sum(size for _, size, _ in entries)
+        keep_paths = [self._entry_path(keep), self._artifact_path(keep)] if keep is not None else []
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            if path in keep_paths:
+                continue
+            if path.endswith(".pkl"):
+                self._remove(path)
+            else:
+                remove_artifact(path)
+            total_size -= size
+
+    def _touch(self, entry_path):
+        # mtime doubles as last access time for the LRU eviction, set it explicitly
+        # since file system timestamps can be coarser than the time between two accesses
+        now = time.time_ns()
+        try:
+            os.utime(entry_path, ns=(now, now))
+        except FileNotFoundError:
+            # already evicted by another process
+            pass
+
+    def _remove(self, entry_path):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _artifact_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _read_file_hash(self, memo_path):
+        try:
+            with open(memo_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _prune_file_hashes(self):
+        # drop the hashes of files that were deleted or changed since, they can't be hit again
+        try:
+            file_names = os.listdir(self.file_hashes_dir)
+        except FileNotFoundError:
+            return
+        for file_name in file_names:
+            if not file_name.endswith(".json"):
+                continue
+            memo_path = os.path.join(self.file_hashes_dir, file_name)
+            memo = self._read_file_hash(memo_path)
+            if memo is None:
+                continue
+            try:
+                stat = os.stat(memo["path"])
+                if stat.st_size == memo["size"] and stat.st_mtime_ns == memo["mtime_ns"]:
+                    continue
+            except FileNotFoundError:
+                pass
+            self._remove(memo_path)
+
+    def _atomic_write(self, path, data):
+        # write to a temporary file next to the target and rename it, readers never see a partial entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -1,18 +1,29 @@
 import os
 import pickle
+from .artifacts import save_artifact, load_artifact, is_artifact
 
 
 def save_stub(stub_path, object):
+    # stub paths ending in .pkl are pickled, any other path is written as a columnar artifact directory
+    if stub_path is None:
+        return
+
     if not os.path.exists(os.path.dirname(stub_path)):
         os.mkdir(os.path.dirname(stub_path))
-    
-    if stub_path is not None:
-        with open(stub_path, "wb") as f:
-            pickle.dump(object, f)
+
+    if not stub_path.endswith(".pkl"):
+        save_artifact(stub_path, object)
+        return
+
+    with open(stub_path, "wb") as f:
+        pickle.dump(object, f)
 
 
 def read_stub(read_from_stub, stub_path):
     if read_from_stub and stub_path is not None and os.path.exists(stub_path):
+        if is_artifact(stub_path):
+            # memory-mapped, frames are only materialized when accessed
+            return load_artifact(stub_path)
         with open(stub_path, 'rb') as f:
             object = pickle.load(f)
             return object
@@ -34,44 +34,287 @@ processed frames back to video files, with support for common video formats.
 
 import cv2
 import os
+import queue
+import threading
+import time
 
-def read_video(video_path):
+# marks the end of a frame queue
+_END_OF_STREAM = object()
+
+def read_video(video_path, start_frame=0, end_frame=None, profiler=None):
     """
     Read all frames from a video file into memory.
 
     Args:
         video_path (str): Path to the input video file.
+        start_frame (int): Index of the first frame to read, the capture seeks to it.
+        end_frame (int, optional): Index one past the last frame to read, None reads to the end.
+        profiler (StageProfiler, optional): Records the decode time of every frame under "decode".
 
     Returns:
         list: List of video frames as numpy arrays.
     """
+    return list(_decode_frames(video_path, start_frame, end_frame, profiler))
+
+def iter_video_frames(video_path, queue_size=0, start_frame=0, end_frame=None, profiler=None):
+    """
+    Read a video file lazily, one frame at a time.
+
+    With queue_size > 0 the frames are decoded on a background thread that stays at most
+    queue_size frames ahead of the consumer, so decoding overlaps with the processing of
+    the previous frames. cv2 releases the GIL while decoding.
+
+    Args:
+        video_path (str): Path to the input video file.
+        queue_size (int): Number of decoded frames buffered ahead, 0 decodes on the calling thread.
+        start_frame (int): Index of the first frame to read, the capture seeks to it.
+        end_frame (int, optional): Index one past the last frame to read, None reads to the end.
+        profiler (StageProfiler, optional): Records the decode time of every frame under "decode".
+
+    Yields:
+        numpy.ndarray: Video frames in order.
+    """
+    if queue_size <= 0:
+        yield from _decode_frames(video_path, start_frame, end_frame, profiler)
+        return
+
+    frame_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+
+    def decode():
+        try:
+            for frame in _decode_frames(video_path, start_frame, end_frame, profiler):
+                if not _put_until_stopped(frame_queue, frame, stop_event):
+                    return
+            _put_until_stopped(frame_queue, _END_OF_STREAM, stop_event)
+        except Exception as e:
+            _put_until_stopped(frame_queue, e, stop_event)
+
+    decode_thread = threading.Thread(target=decode, name="video-decode", daemon=True)
+    decode_thread.start()
+    try:
+        while True:
+            item = frame_queue.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # consumer stopped early or is done, unblock and wait for the decode thread
+        stop_event.set()
+        decode_thread.join()
+
+def _decode_frames(video_path, start_frame=0, end_frame=None, profiler=None):
     cap = cv2.VideoCapture(video_path)
+    try:
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        frame_num = start_frame
+        while end_frame is None or frame_num < end_frame:
+            frame_num += 1
+            start_time = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if profiler is not None:
+                profiler.record("decode", time.perf_counter() - start_time)
+            yield frame
+    finally:
+        cap.release()
+
+def _put_until_stopped(frame_queue, item, stop_event):
+    # blocking put that gives up once stop_event is set, returns whether the item was queued
+    while not stop_event.is_set():
+        try:
+            frame_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def read_video_chunks(video_path, chunk_size, queue_size=0, start_frame=0, end_frame=None, profiler=None):
+    """
+    Read a video file lazily in fixed-size chunks of frames.
+
+    Only one chunk (plus up to queue_size frames decoded ahead) is held in memory at a
+    time, so peak memory depends on chunk_size rather than on the length of the video.
+
+    Args:
+        video_path (str): Path to the input video file.
+        chunk_size (int): Maximum number of frames per chunk.
+        queue_size (int): Number of frames decoded ahead on a background thread, 0 disables the thread.
+        start_frame (int): Index of the first frame to read, the capture seeks to it.
+        end_frame (int, optional): Index one past the last frame to read, None reads to the end.
+        profiler (StageProfiler, optional): Records the decode time of every frame under "decode".
+
+    Yields:
+        tuple: (chunk_start, frames) where chunk_start is the index of the first frame
+            of the chunk relative to start_frame and frames is a list of numpy arrays.
+    """
+    chunk_start = 0
     frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    for frame in iter_video_frames(video_path, queue_size, start_frame, end_frame, profiler):
         frames.append(frame)
-    return frames
+        if len(frames) == chunk_size:
+            yield chunk_start, frames
+            chunk_start += len(frames)
+            frames = []
+    if frames:
+        yield chunk_start, frames
+
+def get_video_frame_count(video_path, start_frame=0, end_frame=None):
+    """
+    Get the number of frames of a video file from its container metadata.
 
-def save_video(ouput_video_frames,output_video_path):
+    Args:
+        video_path (str): Path to the input video file.
+        start_frame (int): Index of the first frame of the range to count.
+        end_frame (int, optional): Index one past the last frame of the range, None counts to the end.
+
+    Returns:
+        int: Number of frames in the range as reported by the container.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if end_frame is not None:
+        frame_count = min(frame_count, end_frame)
+    return max(frame_count - start_frame, 0)
+
+def get_video_fps(video_path):
+    """
+    Get the frame rate of a video file from its container metadata.
+
+    Args:
+        video_path (str): Path to the input video file.
+
+    Returns:
+        float: Frames per second reported by the container.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps
+
+def parse_frame_position(position, fps):
+    """
+    Convert a frame index or a timestamp into a frame index.
+
+    Accepts a plain frame index ("1500"), seconds with an "s" suffix ("62.5s")
+    or a "[hh:]mm:ss[.ms]" timestamp ("12:30", "1:02:03.5").
+
+    Args:
+        position (str): Frame index or timestamp.
+        fps (float): Frame rate used to convert timestamps.
+
+    Returns:
+        int: Frame index.
+    """
+    position = position.strip()
+    if ":" in position:
+        seconds = 0.0
+        for part in position.split(":"):
+            seconds = seconds * 60 + float(part)
+    elif position.endswith("s"):
+        seconds = float(position[:-1])
+    else:
+        return int(position)
+
+    if fps <= 0:
+        raise ValueError(f"Cannot convert timestamp {position} to a frame, video frame rate is unknown")
+    return int(round(seconds * fps))
+
+def resolve_frame_range(video_path, start=None, end=None):
+    """
+    Turn --start/--end style positions into a frame range.
+
+    Args:
+        video_path (str): Path to the input video file, used for its frame rate.
+        start (str, optional): Frame index or timestamp of the first frame, None starts at frame 0.
+        end (str, optional): Frame index or timestamp one past the last frame, None reads to the end.
+
+    Returns:
+        tuple: (start_frame, end_frame) with end_frame None when reading to the end.
+    """
+    fps = get_video_fps(video_path) if start is not None or end is not None else 0
+    start_frame = parse_frame_position(start, fps) if start is not None else 0
+    end_frame = parse_frame_position(end, fps) if end is not None else None
+
+    if start_frame < 0:
+        raise ValueError(f"Start frame must not be negative, got {start_frame}")
+    if end_frame is not None and end_frame <= start_frame:
+        raise ValueError(f"End frame {end_frame} must be after start frame {start_frame}")
+    return start_frame, end_frame
+
+def save_video(ouput_video_frames,output_video_path, queue_size=0, profiler=None):
     """
     Save a sequence of frames as a video file.
 
     Creates necessary directories if they don't exist and writes frames using XVID codec.
+    Frames are written as they are produced, so a generator can be passed to keep
+    memory bounded. With queue_size > 0 the frames are encoded on a background thread,
+    producing a frame blocks once queue_size frames are waiting to be encoded.
 
     Args:
-        ouput_video_frames (list): List of frames to save.
+        ouput_video_frames (iterable): List or generator of frames to save.
         output_video_path (str): Path where the video should be saved.
+        queue_size (int): Number of frames buffered for the encode thread, 0 encodes on the calling thread.
+        profiler (StageProfiler, optional): Records the encode time of every frame under "encode".
     """
     # If folder doesn't exist, create it
     if not os.path.exists(os.path.dirname(output_video_path)):
         os.makedirs(os.path.dirname(output_video_path))
 
+    if queue_size <= 0:
+        _encode_frames(ouput_video_frames, output_video_path, profiler)
+        return
+
+    frame_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    encode_errors = []
+
+    def queued_frames():
+        while True:
+            item = frame_queue.get()
+            if item is _END_OF_STREAM:
+                return
+            yield item
+
+    def encode():
+        try:
+            _encode_frames(queued_frames(), output_video_path, profiler)
+        except Exception as e:
+            encode_errors.append(e)
+            # stop the producer from blocking on a queue nobody reads anymore
+            stop_event.set()
+
+    encode_thread = threading.Thread(target=encode, name="video-encode", daemon=True)
+    encode_thread.start()
+    try:
+        for frame in ouput_video_frames:
+            if not _put_until_stopped(frame_queue, frame, stop_event):
+                break
+    finally:
+        _put_until_stopped(frame_queue, _END_OF_STREAM, stop_event)
+        encode_thread.join()
+
+    if encode_errors:
+        raise encode_errors[0]
+
+def _encode_frames(frames, output_video_path, profiler=None):
     fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_video_path, fourcc, 24, (ouput_video_frames[0].shape[1], ouput_video_frames[0].shape[0]))
-    for frame in ouput_video_frames:
-        out.write(frame)
-    out.release()
+    out = None
+    try:
+        for frame in frames:
+            start_time = time.perf_counter()
+            if out is None:
+                out = cv2.VideoWriter(output_video_path, fourcc, 24, (frame.shape[1], frame.shape[0]))
+            out.write(frame)
+            if profiler is not None:
+                profiler.record("encode", time.perf_counter() - start_time)
+    finally:
+        if out is not None:
+            out.release()
 
 